@@ -0,0 +1,295 @@
+from datetime import datetime, timezone
+import fcntl
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from e2 import ElasticsearchBackend, alert_attributes, epoch_millis, CREATED_AT_TIME_FIELD, INDEX_LAG_MS
+from transform import IST_OFFSET, DATETIME_FORMAT
+
+
+SYNC_INTERVAL = 30
+# How far back the very first sync goes; older windows are served by ES.
+INITIAL_LOOKBACK_DAYS = 90
+
+# Filter params (see e2.ALERT_FILTER_FIELDS) answered from the alerts columns
+FILTER_COLUMNS = {'priority': 'a.priority', 'status': 'a.status', 'service': 'a.service', 'cluster': 'a.cluster'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    alert_key TEXT PRIMARY KEY,
+    created_at_time TEXT,
+    updated_at INTEGER,
+    service TEXT,
+    priority TEXT,
+    status TEXT,
+    cluster TEXT,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS alert_responders (
+    responder TEXT NOT NULL,
+    alert_key TEXT NOT NULL,
+    created_at_time TEXT,
+    PRIMARY KEY (responder, alert_key)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_alert_responders_created ON alert_responders (responder, created_at_time);
+CREATE INDEX IF NOT EXISTS idx_alerts_created ON alerts (created_at_time);
+CREATE INDEX IF NOT EXISTS idx_alerts_service ON alerts (service, created_at_time);
+CREATE INDEX IF NOT EXISTS idx_alerts_priority ON alerts (priority, created_at_time);
+"""
+
+
+def _responder_names(attributes):
+    responders = attributes.get('responders') or []
+    if isinstance(responders, dict):
+        responders = [responders]
+    return {responder['name'] for responder in responders if isinstance(responder, dict) and responder.get('name')}
+
+
+class SQLiteAlertStore:
+    """Local SQLite copy of the projected ``entity.alert`` documents.
+
+    Alerts are keyed by their ES ``_id`` and indexed by responder,
+    ``createdAtTime``, service and priority. ``createdAtTime`` is stored in
+    the same ``yyyy/MM/dd HH:mm:ss`` form ``format_for_es`` produces, so
+    window queries compare strings exactly the way the ES range does.
+    Each thread gets its own connection; WAL mode lets readers run while the
+    sync worker writes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        # A throwaway connection, so none is left cached on the importing
+        # thread (a preloading gunicorn master forks after this runs)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def upsert_hits(self, hits):
+        """Insert or replace a page of ES hits; returns the newest updatedAt seen (epoch millis)."""
+        newest = None
+        alert_rows, responder_rows, keys = [], [], []
+        for hit in hits:
+            alert = hit['_source']
+            attributes = alert_attributes(alert)
+            created_at_time = (hit.get('fields', {}).get(CREATED_AT_TIME_FIELD) or [None])[0]
+            updated_at = epoch_millis(attributes.get('updatedAt'))
+            if updated_at is not None and (newest is None or updated_at > newest):
+                newest = updated_at
+            keys.append((hit['_id'],))
+            alert_rows.append((
+                hit['_id'], created_at_time, updated_at,
+                attributes.get('service'), attributes.get('priority'), attributes.get('status'), attributes.get('cluster'),
+                json.dumps(alert)
+            ))
+            responder_rows.extend((name, hit['_id'], created_at_time) for name in _responder_names(attributes))
+
+        with self._connection() as conn:
+            conn.executemany("DELETE FROM alert_responders WHERE alert_key = ?", keys)
+            conn.executemany("INSERT OR REPLACE INTO alerts VALUES (?, ?, ?, ?, ?, ?, ?, ?)", alert_rows)
+            conn.executemany("INSERT OR REPLACE INTO alert_responders VALUES (?, ?, ?)", responder_rows)
+        return newest
+
+    def iter_alert_pages(self, responder_name, start, end, page_size=1000, filters=None):
+        """Yield pages of alert docs for ``start <= createdAtTime < end`` in createdAtTime order.
+
+        ``filters`` is a filter set from ``e2.alert_filters``, matched like
+        the ES terms filters on the same attributes.
+        """
+        conditions, params = [], [responder_name, start, end]
+        for param, values in filters or ():
+            placeholders = ", ".join("?" * len(values))
+            if param == 'tags':
+                conditions.append(f" AND EXISTS (SELECT 1 FROM json_each(a.doc, '$.parsedMessage.attributes.tags') WHERE value IN ({placeholders}))")
+            else:
+                conditions.append(f" AND {FILTER_COLUMNS[param]} IN ({placeholders})")
+            params.extend(values)
+        cursor = self._connection().execute(
+            "SELECT a.doc FROM alert_responders r JOIN alerts a ON a.alert_key = r.alert_key "
+            "WHERE r.responder = ? AND r.created_at_time >= ? AND r.created_at_time < ?" + "".join(conditions) +
+            " ORDER BY r.created_at_time",
+            params)
+        while True:
+            rows = cursor.fetchmany(page_size)
+            if not rows:
+                return
+            yield [json.loads(doc) for (doc,) in rows]
+
+    def responder_names(self):
+        rows = self._connection().execute("SELECT DISTINCT responder FROM alert_responders ORDER BY responder")
+        return [name for (name,) in rows if '@' not in name]
+
+    def get_state(self, key, default=None):
+        row = self._connection().execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_state(self, key, value):
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?)", (key, json.dumps(value)))
+
+
+class AlertStoreSync:
+    """Background worker keeping a ``SQLiteAlertStore`` in step with ``entity.alert``.
+
+    Every ``interval`` seconds it scrolls the alerts with ``updatedAt`` at or
+    after the stored watermark, upserts them, and advances the watermark to
+    the newest ``updatedAt`` seen minus ``e2.INDEX_LAG_MS``.
+
+    Every gunicorn worker starts one, but only the holder of an exclusive
+    lock on ``<store path>.sync-lock`` syncs; the others retry the lock each
+    interval, so the sync moves to another worker when its holder exits.
+    """
+
+    def __init__(self, backend, store, interval=SYNC_INTERVAL, initial_lookback_days=INITIAL_LOOKBACK_DAYS):
+        self.backend = backend
+        self.store = store
+        self.interval = interval
+        self.initial_lookback_days = initial_lookback_days
+        self.lock_path = f"{store.path}.sync-lock"
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="alert-store-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def sync_once(self):
+        watermark = self.store.get_state('updated_at_watermark')
+        if watermark is None:
+            watermark = int((time.time() - self.initial_lookback_days * 86400) * 1000)
+            # Every alert created from here on has been synced. createdAtTime
+            # is IST wall clock, so the bound is stored the same way.
+            self.store.set_state('covered_from', self.backend.convert_milliseconds_to_datetime(watermark))
+        elif self.store.get_state('covered_from') is None and self.store.get_state('synced_from') is not None:
+            # Stores synced before covered_from kept this bound as UTC wall clock
+            synced_from = datetime.strptime(self.store.get_state('synced_from'), DATETIME_FORMAT)
+            self.store.set_state('covered_from', (synced_from + IST_OFFSET).strftime(DATETIME_FORMAT))
+
+        newest = None
+        count = 0
+        hit_pages = self.backend.iter_updated_alert_hit_pages(watermark)
+        try:
+            for hits in hit_pages:
+                page_newest = self.store.upsert_hits(hits)
+                count += len(hits)
+                if page_newest is not None and (newest is None or page_newest > newest):
+                    newest = page_newest
+        finally:
+            hit_pages.close()
+
+        if newest is not None:
+            self.store.set_state('updated_at_watermark', max(watermark, newest - INDEX_LAG_MS))
+        elif self.store.get_state('updated_at_watermark') is None:
+            self.store.set_state('updated_at_watermark', watermark)
+        logging.info(f"Synced {count} alerts into the local store")
+        return count
+
+    def acquire_lock(self):
+        """Try to become the process that syncs; returns whether this one is."""
+        if self._lock_file is not None:
+            return True
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        logging.info(f"Process {os.getpid()} is syncing the local alert store")
+        return True
+
+    def release_lock(self):
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                try:
+                    if self.acquire_lock():
+                        self.sync_once()
+                except Exception as e:
+                    logging.error(f"Error syncing local alert store: {e}")
+                self._stop.wait(self.interval)
+        finally:
+            self.release_lock()
+
+
+class SQLiteAlertBackend(ElasticsearchBackend):
+    """Sibling of ``ElasticsearchBackend`` that answers alert queries from a ``SQLiteAlertStore``.
+
+    Windows starting before the store's first synced instant, and raw
+    (``all_fields``) requests, are passed through to ``fallback``.
+    """
+
+    def __init__(self, store, fallback):
+        self.store = store
+        self.fallback = fallback
+
+    def _covered(self, start):
+        covered_from = self.store.get_state('covered_from')
+        return covered_from is not None and self.store.get_state('updated_at_watermark') is not None and start >= covered_from
+
+    def iter_alert_pages(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", all_fields=False, filters=None):
+        if not start_date:
+            start_date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        if not end_date:
+            end_date = start_date
+        start = self.format_for_es(start_date, start_time)
+        end = self.format_for_es(end_date, end_time)
+        if all_fields or not self._covered(start):
+            return self.fallback.iter_alert_pages(responder_name, start_date, end_date, start_time, end_time, all_fields, filters=filters)
+        return self.store.iter_alert_pages(responder_name, start, end, filters=filters)
+
+    def iter_alerts(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", all_fields=False, filters=None):
+        pages = self.iter_alert_pages(responder_name, start_date, end_date, start_time, end_time, all_fields, filters)
+        try:
+            for page in pages:
+                yield from page
+        finally:
+            pages.close()
+
+    def get_alerts(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", all_fields=False, filters=None):
+        try:
+            return list(self.iter_alerts(responder_name, start_date, end_date, start_time, end_time, all_fields, filters))
+        except Exception as e:
+            logging.error(f"Error fetching alerts: {e}")
+            return []
+
+    def fetch_unique_responder_names(self):
+        if self.store.get_state('updated_at_watermark') is None:
+            return self.fallback.fetch_unique_responder_names()
+        return self.store.responder_names()
+
+    def get_unique_responder_names(self):
+        try:
+            return self.fetch_unique_responder_names()
+        except Exception as e:
+            logging.error(f"General error when fetching unique responder names: {e}")
+            return []
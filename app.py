@@ -132,24 +132,152 @@
 # if __name__ == "__main__":
 #     app.run(debug=True, port=5000)
 from flask import Flask, request, jsonify, Response
-from e2 import ElasticsearchBackend  
+from e2 import ElasticsearchBackend, CSV_COLUMNS, STATS_GROUP_BY_FIELDS, TIMELINE_SPLIT_FIELDS, timeline_interval, ALERT_FILTER_FIELDS, alert_filters, ALERT_SORT_FIELDS, DEFAULT_ALERT_SORT, MAX_PAGE_LIMIT
+from cache import BucketedAlertCache, StaleWhileRevalidateCache, TimelineCache, CoalescingAlertSource, EPOCH, DEFAULT_MAX_ALERTS
+from async_backend import AsyncElasticsearchBackend
+from es_client import ElasticsearchSettings, CircuitBreaker
+from alert_store import SQLiteAlertStore, AlertStoreSync, SQLiteAlertBackend
+from columnar import ALERT_EXPORTER, EXPORT_FORMATS
+from serialization import FastJSONProvider, dumps, dumps_envelope, compress_response
+from live_feed import AlertFeedHub, FeedFullError, FEED_CLOSED, MAX_SUBSCRIBERS
+from metrics import REQUEST_LATENCY, start_request_timings, current_timings, render_metrics
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
 import logging
+import os
 import pytz
 from uuid import uuid4
 from time import time
 from flask_cors import CORS
 import csv
 from io import StringIO
-from datetime import datetime
+from itertools import chain
+from datetime import datetime, timedelta
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)
 
-es_backend = ElasticsearchBackend(["http://apm-logging-es.internal.olympus-world.zetaapps.in:9200"])
-
-@app.route('/alerts', methods=['GET'])
-def fetch_alerts():
-    processing_start_time = time()
+# Hosts, timeouts, pool size, retries and the circuit breaker are configured
+# through ES_* environment variables; see es_client.ElasticsearchSettings.
+# Clients connect lazily, so the app starts even while ES is unreachable.
+es_settings = ElasticsearchSettings.from_env()
+es_breaker = CircuitBreaker(es_settings.breaker_failures, es_settings.breaker_reset_timeout)
+es_backend = ElasticsearchBackend(settings=es_settings, breaker=es_breaker)
+async_es_backend = AsyncElasticsearchBackend(settings=es_settings, breaker=es_breaker)
+
+# With ALERT_STORE_PATH set, interactive queries are answered from a local
+# SQLite copy of entity.alert kept up to date by a background sync worker.
+ALERT_STORE_PATH = os.environ.get('ALERT_STORE_PATH')
+# Alerts held by the in-memory bucket cache, per worker process
+ALERT_CACHE_MAX_ALERTS = int(os.environ.get('ALERT_CACHE_MAX_ALERTS', DEFAULT_MAX_ALERTS))
+alert_store_sync = None
+if ALERT_STORE_PATH:
+    alert_store = SQLiteAlertStore(ALERT_STORE_PATH)
+    alert_store_sync = AlertStoreSync(es_backend, alert_store)
+    alert_source = SQLiteAlertBackend(alert_store, fallback=BucketedAlertCache(es_backend, max_alerts=ALERT_CACHE_MAX_ALERTS))
+    stream_source = SQLiteAlertBackend(alert_store, fallback=es_backend)
+else:
+    alert_source = BucketedAlertCache(es_backend, max_alerts=ALERT_CACHE_MAX_ALERTS)
+    stream_source = es_backend
+# Streamed responses (NDJSON, CSV, exports) skip the bucket cache: it loads
+# every bucket of a window before handing out the first page, which would
+# hold a whole export in memory and delay its first byte until the end
+
+# Identical concurrent /alerts queries share one fetch; window ends are
+# rounded up to this many seconds so "until now" queries line up (0 disables)
+ALERT_QUERY_GRANULARITY = int(os.environ.get('ALERT_QUERY_GRANULARITY', 30))
+alert_source = CoalescingAlertSource(alert_source, es_backend, timedelta(seconds=ALERT_QUERY_GRANULARITY))
+# /alerts/stream: one shared incremental poller per watched responder in
+# each worker. Every open stream holds a worker thread, so keep the cap well
+# under GUNICORN_THREADS; streams over it get a 503.
+ALERT_FEED_INTERVAL = float(os.environ.get('ALERT_FEED_INTERVAL', 5))
+ALERT_FEED_MAX_STREAMS = int(os.environ.get('ALERT_FEED_MAX_STREAMS', MAX_SUBSCRIBERS))
+alert_feed = AlertFeedHub(es_backend, es_backend, ALERT_FEED_INTERVAL, ALERT_FEED_MAX_STREAMS)
+
+# Timelines are always aggregated by ES; the local store has no histograms
+timeline_source = TimelineCache(es_backend)
+responder_names_cache = StaleWhileRevalidateCache(alert_source.fetch_unique_responder_names, ttl=600, name="responder-names")
+
+
+def start_background_tasks():
+    """Start the store sync and prime caches; run once per serving process.
+
+    Not done at import: gunicorn preloads this module in its master and
+    threads started there would not survive the fork into the workers.
+    """
+    if alert_store_sync is not None:
+        alert_store_sync.start()
+    responder_names_cache.prime()
+
+
+def shutdown():
+    """Stop background work and clear scroll contexts left open by unfinished requests."""
+    if alert_store_sync is not None:
+        alert_store_sync.stop()
+    alert_feed.close()
+    es_backend.close()
+    async_es_backend.close()
+
+# Number of alerts buffered per chunk in streaming responses
+STREAM_CHUNK_SIZE = 100
+
+# Page size for /alerts when a cursor is given without a limit
+DEFAULT_PAGE_LIMIT = 50
+
+DEFAULT_TIMELINE_INTERVAL = '1h'
+
+# Comment lines sent on idle SSE streams so proxies keep them open
+FEED_HEARTBEAT_SECONDS = 15
+# Each SSE stream holds a worker thread; ending it now and then lets the
+# client reconnect (resuming from Last-Event-ID) and spreads streams evenly
+FEED_MAX_STREAM_SECONDS = int(os.environ.get('ALERT_FEED_MAX_STREAM_SECONDS', 600))
+
+# Overall deadline for the ES work behind one async view
+ASYNC_VIEW_TIMEOUT = 60
+
+@app.after_request
+def compress(response):
+    return compress_response(response, request.accept_encodings)
+
+@app.before_request
+def start_timings():
+    start_request_timings(request.url_rule.rule if request.url_rule else 'unmatched')
+
+@app.after_request
+def record_request_metrics(response):
+    timings = current_timings()
+    method, status = request.method, str(response.status_code)
+
+    # Streamed bodies are still being produced here, so observe once the response is closed
+    def observe():
+        REQUEST_LATENCY.labels(timings.route, method, status).observe(timings.elapsed())
+        timings.observe()
+
+    response.call_on_close(observe)
+    return response
+
+def timed_pages(pages, timings):
+    """Yield from ``pages``, charging the wait for each page to the ``fetch`` stage."""
+    try:
+        while True:
+            with timings.stage('fetch'):
+                page = next(pages, None)
+            if page is None:
+                return
+            yield page
+    finally:
+        pages.close()
+
+def alerts_etag(responder_name, representation, fingerprint, filters=None):
+    """Weak ETag for one representation of a (filtered) result set, from its ``ResultFingerprint``."""
+    key = json.dumps([responder_name, representation, filters or [], fingerprint.value()])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+def parse_alert_window():
     responder_name = request.args.get('responder_name', default='olympus_middleware_sre')
     
     # Set timezone to IST
@@ -167,108 +295,576 @@ def fetch_alerts():
     # Default end_time to the current time in IST
     end_time = request.args.get('end_time', default=datetime.now(ist_timezone).strftime('%H:%M:%S'))
 
+    return responder_name, start_date, end_date, start_time, end_time
+
+def parse_alert_filters():
+    """Filters from ``?priority=P1,P2&status=open&tags=db``; params may repeat or hold comma-separated values.
+
+    Returns None when no filter is given, so unfiltered requests share cache
+    entries with internal callers.
+    """
+    return alert_filters({param: request.args.getlist(param) for param in ALERT_FILTER_FIELDS}) or None
+
+def parse_alert_sort(value):
+    """Parse ``sort=Priority,-CreatedAt`` (or ``Priority:desc``) into ``[(name, order), ...]``.
+
+    Names are matched case-insensitively against ``ALERT_SORT_FIELDS``;
+    raises ValueError for unknown fields or orders.
+    """
+    names = {name.lower(): name for name in ALERT_SORT_FIELDS}
+    sort = []
+    for key in value.split(','):
+        key = key.strip()
+        order = 'asc'
+        if key.startswith('-'):
+            key, order = key[1:], 'desc'
+        elif ':' in key:
+            key, order = key.split(':', 1)
+            order = order.lower()
+        if key.lower() not in names or order not in ('asc', 'desc'):
+            raise ValueError(f"sort must use {', '.join(ALERT_SORT_FIELDS)} with an optional - prefix or :asc/:desc suffix")
+        sort.append((names[key.lower()], order))
+    return sort
+
+def encode_cursor(sort, search_after):
+    payload = json.dumps({"sort": sort, "after": search_after}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Return ``(sort, search_after)`` from a cursor made by ``encode_cursor``; raises ValueError if malformed."""
     try:
-        alerts = es_backend.get_alerts(responder_name, start_date, end_date, start_time, end_time)
-        if not alerts:
-            return jsonify({"message": "No alerts found"}), 404
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        sort = [(name, order) for name, order in payload["sort"]]
+        search_after = payload["after"]
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise ValueError("invalid cursor")
+    # Validated here so a tampered cursor is a 400, not an ES error: known
+    # fields and orders, and one search_after value per sort key plus the tiebreaker
+    if (not sort or not isinstance(search_after, list) or len(search_after) != len(sort) + 1
+            or any(not isinstance(name, str) or name not in ALERT_SORT_FIELDS or order not in ('asc', 'desc') for name, order in sort)):
+        raise ValueError("invalid cursor")
+    return sort, search_after
+
+def parse_limit(default=None, maximum=None):
+    """The ``limit`` argument as an int in ``1..maximum``, or ``default`` when absent; raises ValueError otherwise."""
+    value = request.args.get('limit')
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if limit <= 0 or (maximum is not None and limit > maximum):
+        raise ValueError(f"limit must be between 1 and {maximum}" if maximum is not None else "limit must be a positive integer")
+    return limit
 
-        readable_alerts = [es_backend.map_field_names(es_backend.flatten_json(alert)) for alert in alerts]
+@app.route('/alerts', methods=['GET'])
+def fetch_alerts():
+    processing_start_time = time()
+    responder_name, start_date, end_date, start_time, end_time = parse_alert_window()
+    filters = parse_alert_filters()
+
+    # fields=all skips source filtering and returns the raw alert documents
+    all_fields = request.args.get('fields') == 'all'
+
+    if request.args.get('format') == 'ndjson':
+        return stream_alerts_ndjson(responder_name, start_date, end_date, start_time, end_time, all_fields, filters)
+
+    # limit, sort or cursor switch to one page at a time via search_after
+    if any(arg in request.args for arg in ('limit', 'sort', 'cursor')):
+        return fetch_alerts_page(responder_name, start_date, end_date, start_time, end_time, filters)
+
+    timings = current_timings()
+    representation = 'raw' if all_fields else 'mapped'
+    if 'end_time' not in request.args:
+        # Only "until now" windows are rounded up to share fetches; an
+        # explicit end_time is served exactly as asked
+        start_date, end_date, start_time, end_time = alert_source.normalize_window(start_date, end_date, start_time, end_time)
+    if request.if_none_match:
+        # One size-0 aggregation instead of the whole window when the client has a copy
+        try:
+            with timings.stage('fingerprint'):
+                current = es_backend.get_alert_fingerprint(responder_name, start_date, end_date, start_time, end_time, filters)
+            etag = alerts_etag(responder_name, representation, current, filters)
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+                response.set_etag(etag, weak=True)
+                return response
+        except Exception as e:
+            logging.error(f"Error fingerprinting alerts: {e}")
+
+    try:
+        # Mapped alerts are kept as compact records; each raw page is released once transformed.
+        # The ETag is fingerprinted from the alerts actually served, so a stale cached
+        # window never gets the ETag of the fresher data in ES. Concurrent identical
+        # requests share a single fetch and transform.
+        readable_alerts, served = alert_source.get_alert_records(responder_name, start_date, end_date, start_time, end_time, all_fields, filters)
+        if not readable_alerts:
+            return jsonify({"message": "No alerts found"}), 404
 
         processing_end_time = time()
         processing_time = processing_end_time - processing_start_time
         count = len(readable_alerts)
 
+        # Serialization happens after the timings are taken, so it is only
+        # reported in the Server-Timing header and /metrics
         response = {
             "request_id": str(uuid4()),
             "took": processing_time,
-            "data": readable_alerts,
+            "timings": timings.as_dict(),
             "count": count
         }
 
+        with timings.stage('serialize'):
+            # Records write their own JSON into the data array; no dict per alert
+            body = dumps_envelope(response, readable_alerts)
+        timings.incr('bytes', len(body))
+        response = Response(body, status=200, mimetype=app.json.mimetype, headers={"Server-Timing": timings.server_timing()})
+        response.set_etag(alerts_etag(responder_name, representation, served, filters), weak=True)
+        return response
+    except Exception as e:
+        logging.error(f"Error fetching alerts: {e}")
+        return jsonify({"error": "Error processing alerts"}), 500
+
+def fetch_alerts_page(responder_name, start_date, end_date, start_time, end_time, filters=None):
+    """Serve one ``limit``-sized page of mapped alerts plus the total and a cursor for the next page."""
+    processing_start_time = time()
+    try:
+        limit = parse_limit(DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT)
+        sort = parse_alert_sort(request.args['sort']) if request.args.get('sort') else None
+        search_after = None
+        if request.args.get('cursor'):
+            cursor_sort, search_after = decode_cursor(request.args['cursor'])
+            if sort is not None and sort != cursor_sort:
+                raise ValueError("sort does not match the cursor")
+            sort = cursor_sort
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    sort = sort or DEFAULT_ALERT_SORT
+
+    timings = current_timings()
+    try:
+        with timings.stage('fetch'):
+            alerts, total, next_search_after = es_backend.search_alerts_page(
+                responder_name, start_date, end_date, start_time, end_time, sort, limit, search_after, filters)
+        with timings.stage('transform'):
+            readable_alerts = es_backend.transform_alerts(alerts)
+
+        response = {
+            "request_id": str(uuid4()),
+            "took": time() - processing_start_time,
+            "timings": timings.as_dict(),
+            "data": readable_alerts,
+            "count": len(readable_alerts),
+            "total": total,
+            "sort": [f"{name}:{order}" for name, order in sort],
+            "next_cursor": encode_cursor(sort, next_search_after) if next_search_after else None
+        }
+
         return jsonify(response), 200
+    except Exception as e:
+        logging.error(f"Error fetching alerts page: {e}")
+        return jsonify({"error": "Error processing alerts"}), 500
+
+def stream_alerts_ndjson(responder_name, start_date, end_date, start_time, end_time, all_fields=False, filters=None):
+    """Stream one mapped (or raw, with ``all_fields``) alert per line while scroll pages are still arriving."""
+    timings = current_timings()
+    try:
+        pages = timed_pages(stream_source.iter_alert_pages(responder_name, start_date, end_date, start_time, end_time, all_fields, filters=filters), timings)
+        first_page = next(pages, None)
     except Exception as e:
         logging.error(f"Error fetching alerts: {e}")
         return jsonify({"error": "Error processing alerts"}), 500
 
+    if not first_page:
+        return jsonify({"message": "No alerts found"}), 404
+
+    def generate_ndjson():
+        try:
+            for page in chain([first_page], pages):
+                if not all_fields:
+                    with timings.stage('transform'):
+                        page = es_backend.transform_records(page)
+                for start in range(0, len(page), STREAM_CHUNK_SIZE):
+                    with timings.stage('serialize'):
+                        chunk = b"".join(dumps(alert) + b"\n" for alert in page[start:start + STREAM_CHUNK_SIZE])
+                    timings.incr('bytes', len(chunk))
+                    yield chunk
+        except Exception as e:
+            # Abort the response rather than end a truncated stream with a 200
+            logging.error(f"Error streaming alerts: {e}")
+            raise
+        finally:
+            pages.close()
+
+    # Server-Timing can only cover the first page; the full breakdown goes to /metrics
+    return Response(generate_ndjson(), mimetype="application/x-ndjson", headers={"Server-Timing": timings.server_timing()})
+
+@app.route('/alerts/stream', methods=['GET'])
+def stream_alert_changes():
+    """Server-Sent Events feed of new and updated mapped alerts for one responder.
+
+    Every event is ``event: alerts`` with the delta as JSON and an ``id``
+    that clients send back as ``Last-Event-ID`` on reconnect to receive
+    what they missed.
+    """
+    responder_name = request.args.get('responder_name', default='olympus_middleware_sre')
+    filters = parse_alert_filters()
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    try:
+        subscription = alert_feed.subscribe(responder_name, last_event_id, filters)
+    except FeedFullError as e:
+        logging.warning(f"Refusing alert stream for {responder_name}: {e}")
+        response = jsonify({"error": "Too many open alert streams, retry shortly"})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+
+    def events():
+        deadline = time() + FEED_MAX_STREAM_SECONDS
+        yield b"retry: 5000\n\n"
+        while time() < deadline:
+            event = subscription.get(timeout=FEED_HEARTBEAT_SECONDS)
+            if event is FEED_CLOSED:
+                return
+            yield event if event is not None else b": keep-alive\n\n"
+
+    response = Response(events(), mimetype='text/event-stream',
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # Also runs when the client leaves before the first event, which a
+    # finally in the generator would miss, so the stream's slot is released
+    response.call_on_close(lambda: alert_feed.unsubscribe(subscription))
+    return response
+
+@app.route('/alerts/batch', methods=['GET'])
+def fetch_alerts_batch():
+    processing_start_time = time()
+    _, start_date, end_date, start_time, end_time = parse_alert_window()
+    filters = parse_alert_filters()
+
+    # Accept both ?responder_names=a,b and repeated ?responder_name=a&responder_name=b
+    responder_names = request.args.getlist('responder_name')
+    for names in request.args.getlist('responder_names'):
+        responder_names.extend(name.strip() for name in names.split(',') if name.strip())
+    responder_names = list(dict.fromkeys(responder_names))
+    if not responder_names:
+        return jsonify({"error": "responder_names is required"}), 400
+
+    try:
+        limit = parse_limit()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    timings = current_timings()
+    try:
+        with timings.stage('fetch'):
+            grouped = es_backend.get_alerts_by_responder(responder_names, start_date, end_date, start_time, end_time, limit, filters)
+        with timings.stage('transform'):
+            data = {name: es_backend.transform_alerts(alerts) for name, alerts in grouped.items()}
+
+        response = {
+            "request_id": str(uuid4()),
+            "took": time() - processing_start_time,
+            "timings": timings.as_dict(),
+            "data": data,
+            "counts": {name: len(alerts) for name, alerts in data.items()}
+        }
+
+        return jsonify(response), 200
+    except Exception as e:
+        logging.error(f"Error fetching batch alerts: {e}")
+        return jsonify({"error": "Error processing alerts"}), 500
+
+@app.route('/alerts/stats', methods=['GET'])
+def fetch_alert_stats():
+    processing_start_time = time()
+    responder_name, start_date, end_date, start_time, end_time = parse_alert_window()
+    filters = parse_alert_filters()
+
+    group_by = request.args.get('group_by')
+    if group_by and group_by not in STATS_GROUP_BY_FIELDS:
+        return jsonify({"error": f"group_by must be one of {', '.join(STATS_GROUP_BY_FIELDS)}"}), 400
+
+    timings = current_timings()
+    try:
+        with timings.stage('fetch'):
+            stats = es_backend.get_alert_stats(responder_name, start_date, end_date, start_time, end_time, group_by, filters)
+
+        response = {
+            "request_id": str(uuid4()),
+            "took": time() - processing_start_time,
+            "timings": timings.as_dict(),
+            "group_by": group_by,
+            "overall": stats["overall"],
+            "groups": stats["groups"]
+        }
+
+        return jsonify(response), 200
+    except Exception as e:
+        logging.error(f"Error fetching alert stats: {e}")
+        return jsonify({"error": "Error processing alert stats"}), 500
+
+@app.route('/alerts/timeline', methods=['GET'])
+def fetch_alert_timeline():
+    """Alert counts per ``interval`` (e.g. 15m, 1h, 1d) of IST creation time, optionally split by Priority or Status."""
+    processing_start_time = time()
+    responder_name, start_date, end_date, start_time, end_time = parse_alert_window()
+    filters = parse_alert_filters()
+
+    interval = request.args.get('interval', DEFAULT_TIMELINE_INTERVAL)
+    if timeline_interval(interval) is None:
+        return jsonify({"error": "interval must be a number followed by m, h or d, e.g. 15m, 1h or 1d"}), 400
+    split_by = request.args.get('split_by')
+    if split_by and split_by not in TIMELINE_SPLIT_FIELDS:
+        return jsonify({"error": f"split_by must be one of {', '.join(TIMELINE_SPLIT_FIELDS)}"}), 400
+
+    timings = current_timings()
+    try:
+        with timings.stage('fetch'):
+            buckets = timeline_source.get_alert_timeline(responder_name, start_date, end_date, start_time, end_time, interval, split_by, filters)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logging.error(f"Error fetching alert timeline: {e}")
+        return jsonify({"error": "Error processing alert timeline"}), 500
+
+    timeline = []
+    for bucket in buckets:
+        entry = {
+            "start": (EPOCH + timedelta(milliseconds=bucket["key"])).strftime('%Y-%m-%d %H:%M:%S'),
+            "count": bucket["count"]
+        }
+        if split_by:
+            entry["groups"] = bucket["groups"]
+        timeline.append(entry)
+
+    response = {
+        "request_id": str(uuid4()),
+        "took": time() - processing_start_time,
+        "timings": timings.as_dict(),
+        "interval": interval,
+        "time_zone": "Asia/Kolkata",
+        "split_by": split_by,
+        "total": sum(bucket["count"] for bucket in buckets),
+        "buckets": timeline
+    }
+    return jsonify(response), 200
+
 @app.route('/responder_names', methods=['GET'])
 def get_responder_names():
     try:
-        unique_responder_names = es_backend.get_unique_responder_names()
+        unique_responder_names = responder_names_cache.get()
         return jsonify({"responder_names": unique_responder_names}), 200
     except Exception as e:
         logging.error(f"Error fetching unique responder names: {e}")
         return jsonify({"error": "Error fetching unique responder names"}), 500
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
 @app.route('/alerts_csv', methods=['GET'])
 def fetch_alerts_csv():
+    responder_name, start_date, end_date, start_time, end_time = parse_alert_window()
+    filters = parse_alert_filters()
+
+    timings = current_timings()
+    try:
+        pages = timed_pages(stream_source.iter_alert_pages(responder_name, start_date, end_date, start_time, end_time, filters=filters), timings)
+        first_page = next(pages, None)
+    except Exception as e:
+        logging.error(f"Error fetching alerts CSV: {str(e)}")
+        return "Error processing alerts CSV", 500
+
+    if first_page is None:
+        return jsonify({"message": "No alerts found"}), 404
+
+    def generate_csv():
+        # Each alert is transformed exactly once and every scroll page is
+        # flushed to the client as soon as it has been written.
+        header = csv_chunk([CSV_COLUMNS])
+        timings.incr('bytes', len(header))
+        yield header
+        try:
+            for page in chain([first_page], pages):
+                with timings.stage('transform'):
+                    # Record columns are CSV_COLUMNS, with '' for missing values
+                    rows = [record.csv_row() for record in es_backend.transform_records(page)]
+                with timings.stage('serialize'):
+                    chunk = csv_chunk(rows)
+                timings.incr('bytes', len(chunk))
+                yield chunk
+        except Exception as e:
+            # Re-raise so the server aborts the chunked response; ending it
+            # normally would hand the client a truncated file with a 200.
+            logging.error(f"Error streaming alerts CSV: {str(e)}")
+            raise
+        finally:
+            pages.close()
+
+    # Server-Timing can only cover the first page; the full breakdown goes to /metrics
+    return Response(
+        generate_csv(),
+        mimetype="text/csv",
+        headers={"Content-disposition": "attachment; filename=alerts.csv", "Server-Timing": timings.server_timing()})
+
+
+@app.route('/alerts_export', methods=['GET'])
+def fetch_alerts_export():
+    """Stream the window as a typed Parquet file or Arrow IPC stream, converted a scroll page at a time."""
+    responder_name, start_date, end_date, start_time, end_time = parse_alert_window()
+    filters = parse_alert_filters()
+
+    export_format = request.args.get('format', default='parquet')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    mimetype, filename = EXPORT_FORMATS[export_format]
+
+    timings = current_timings()
+    try:
+        pages = timed_pages(stream_source.iter_alert_pages(responder_name, start_date, end_date, start_time, end_time, filters=filters), timings)
+        first_page = next(pages, None)
+    except Exception as e:
+        logging.error(f"Error fetching alerts export: {str(e)}")
+        return jsonify({"error": "Error processing alerts export"}), 500
+
+    if first_page is None:
+        return jsonify({"message": "No alerts found"}), 404
+
+    def record_batches():
+        for page in chain([first_page], pages):
+            with timings.stage('transform'):
+                batch = ALERT_EXPORTER.record_batch(page)
+            yield batch
+
+    def generate_export():
+        try:
+            for chunk in ALERT_EXPORTER.iter_export(export_format, record_batches()):
+                if chunk:
+                    timings.incr('bytes', len(chunk))
+                    yield chunk
+        except Exception as e:
+            # Abort the response: an Arrow stream cut short still reads as a
+            # complete, shorter table, so ending normally would drop rows silently
+            logging.error(f"Error streaming alerts export: {str(e)}")
+            raise
+        finally:
+            pages.close()
+
+    return Response(
+        generate_export(),
+        mimetype=mimetype,
+        headers={"Content-disposition": f"attachment; filename={filename}", "Server-Timing": timings.server_timing()})
+
+
+def csv_chunk(rows):
+    si = StringIO()
+    csv.writer(si).writerows(rows)
+    return si.getvalue()
+
+
+# Async variants of the main views. ES calls are multiplexed on the async
+# backend's single event loop and bounded by ASYNC_VIEW_TIMEOUT, so a slow
+# query fails with 504 instead of holding a worker for minutes.
+
+@app.route('/async/alerts', methods=['GET'])
+async def fetch_alerts_async():
     processing_start_time = time()
-    responder_name = request.args.get('responder_name', default='olympus_middleware_sre')
-    
-    # Set timezone to IST
-    ist_timezone = pytz.timezone('Asia/Kolkata')
-    
-    # Default start_date to today's date in IST
-    start_date = request.args.get('start_date', default=datetime.now(ist_timezone).strftime('%Y-%m-%d'))
-    
-    # Default end_date to today's date in IST
-    end_date = request.args.get('end_date', default=datetime.now(ist_timezone).strftime('%Y-%m-%d'))
-    
-    # Default start_time to 00:00:00 of the current day in IST
-    start_time = request.args.get('start_time', default='00:00:00')
-    
-    # Default end_time to the current time in IST
-    end_time = request.args.get('end_time', default=datetime.now(ist_timezone).strftime('%H:%M:%S'))
+    responder_name, start_date, end_date, start_time, end_time = parse_alert_window()
+    filters = parse_alert_filters()
 
+    timings = current_timings()
     try:
-        alerts = es_backend.get_alerts(responder_name, start_date, end_date, start_time, end_time)
+        with timings.stage('fetch'):
+            alerts = await async_es_backend.runner.run(
+                async_es_backend.get_alerts(responder_name, start_date, end_date, start_time, end_time, filters=filters), ASYNC_VIEW_TIMEOUT)
         if not alerts:
             return jsonify({"message": "No alerts found"}), 404
 
-        readable_alerts = [es_backend.map_field_names(es_backend.flatten_json(alert)) for alert in alerts]
-
-        processing_end_time = time()
-        processing_time = processing_end_time - processing_start_time
+        with timings.stage('transform'):
+            readable_alerts = async_es_backend.transform_alerts(alerts)
         count = len(readable_alerts)
 
         response = {
             "request_id": str(uuid4()),
-            "took": processing_time,
+            "took": time() - processing_start_time,
+            "timings": timings.as_dict(),
             "data": readable_alerts,
             "count": count
         }
 
-        # Determine all unique columns across all alerts
-        all_columns = set()
-        for alert in alerts:
-            alert_flat = es_backend.map_field_names(es_backend.flatten_json(alert))
-            all_columns.update(alert_flat.keys())
-        
-        all_columns = list(all_columns)  # Convert set to list to keep column order consistent
+        return jsonify(response), 200
+    except asyncio.TimeoutError:
+        logging.error("Timed out fetching alerts")
+        return jsonify({"error": "Timed out fetching alerts"}), 504
+    except Exception as e:
+        logging.error(f"Error fetching alerts: {e}")
+        return jsonify({"error": "Error processing alerts"}), 500
 
-        # Convert alerts to CSV
-        si = StringIO()
-        cw = csv.writer(si)
-        
-        # Write headers
-        cw.writerow(all_columns)
-        
-        # Write the data rows
-        for alert in alerts:
-            alert_flat = es_backend.map_field_names(es_backend.flatten_json(alert))
-            row = [alert_flat.get(column, '') for column in all_columns]  # Use empty string for missing values
-            cw.writerow(row)
-
-        output = si.getvalue()
-        si.close()
-
-        return Response(
-            output,
-            mimetype="text/csv",
-            headers={"Content-disposition": "attachment; filename=alerts.csv"})
+@app.route('/async/responder_names', methods=['GET'])
+async def get_responder_names_async():
+    try:
+        unique_responder_names = await async_es_backend.runner.run(
+            async_es_backend.fetch_unique_responder_names(), ASYNC_VIEW_TIMEOUT)
+        return jsonify({"responder_names": unique_responder_names}), 200
+    except asyncio.TimeoutError:
+        logging.error("Timed out fetching unique responder names")
+        return jsonify({"error": "Timed out fetching unique responder names"}), 504
+    except Exception as e:
+        logging.error(f"Error fetching unique responder names: {e}")
+        return jsonify({"error": "Error fetching unique responder names"}), 500
+
+@app.route('/async/alerts_csv', methods=['GET'])
+async def fetch_alerts_csv_async():
+    responder_name, start_date, end_date, start_time, end_time = parse_alert_window()
+    filters = parse_alert_filters()
+
+    runner = async_es_backend.runner
+    pages = async_es_backend.iter_alert_pages(responder_name, start_date, end_date, start_time, end_time, filters=filters)
+    try:
+        first_page = await runner.anext(pages, ASYNC_VIEW_TIMEOUT)
+    except asyncio.TimeoutError:
+        logging.error("Timed out fetching alerts CSV")
+        return "Timed out fetching alerts CSV", 504
     except Exception as e:
         logging.error(f"Error fetching alerts CSV: {str(e)}")
         return "Error processing alerts CSV", 500
 
+    if first_page is None:
+        return jsonify({"message": "No alerts found"}), 404
+
+    # The rest of the pages are fetched on the shared loop as the response is written
+    rest = runner.iterate(pages, ASYNC_VIEW_TIMEOUT)
+
+    def generate_csv():
+        try:
+            yield csv_chunk([CSV_COLUMNS])
+            for page in chain([first_page], rest):
+                rows = [
+                    [alert_flat.get(column, '') for column in CSV_COLUMNS]
+                    for alert_flat in async_es_backend.transform_alerts(page)
+                ]
+                yield csv_chunk(rows)
+        except Exception as e:
+            logging.error(f"Error streaming alerts CSV: {str(e)}")
+            raise
+        finally:
+            rest.close()
+
+    return Response(
+        generate_csv(),
+        mimetype="text/csv",
+        headers={"Content-disposition": "attachment; filename=alerts.csv"})
+
 
 if __name__ == "__main__":
-     app.run(host='0.0.0.0, port=5000)
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
+    start_background_tasks()
+    try:
+        app.run(host='0.0.0.0', port=5000)
+    finally:
+        shutdown()
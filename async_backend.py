@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import threading
+
+from e2 import ElasticsearchBackend, ALERT_INDEX, CREATED_AT_TIME_FIELD, SCROLL_TIMEOUT, SCROLL_PAGE_SIZE, SOURCE_FIELDS
+from metrics import es_call
+from es_client import ElasticsearchSettings, CircuitBreaker, create_async_client
+
+
+_END = object()
+
+
+async def _anext(async_gen):
+    # Runs on the shared loop, so that loop is the one that adopts (and
+    # eventually finalizes) the generator on its first iteration.
+    try:
+        return await async_gen.__anext__()
+    except StopAsyncIteration:
+        return _END
+
+
+async def _aclose(async_gen):
+    await async_gen.aclose()
+
+
+class EventLoopThread:
+    """A single event loop running in a daemon thread.
+
+    All async ES calls are multiplexed on this loop, so one
+    ``AsyncElasticsearch`` client and its connection pool serve every
+    in-flight request regardless of which worker thread issued it.
+    """
+
+    def __init__(self, name="es-async-loop"):
+        self.name = name
+        self.loop = None
+        self.thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Started on first use rather than at import, so a gunicorn master
+        # that preloads the app never forks with this thread running.
+        if self.loop is None:
+            with self._lock:
+                if self.loop is None:
+                    loop = asyncio.new_event_loop()
+                    self.thread = threading.Thread(target=loop.run_forever, name=self.name, daemon=True)
+                    self.thread.start()
+                    self.loop = loop
+        return self.loop
+
+    def submit(self, coro, timeout=None):
+        loop = self._ensure_started()
+        if timeout is not None:
+            coro = asyncio.wait_for(coro, timeout)
+        return asyncio.run_coroutine_threadsafe(coro, loop)
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=5)
+
+    async def run(self, coro, timeout=None):
+        """Await ``coro`` on the shared loop from any other event loop."""
+        return await asyncio.wrap_future(self.submit(coro, timeout))
+
+    async def anext(self, async_gen, timeout=None, default=None):
+        """Await the next item of ``async_gen`` from another event loop, or ``default`` once it is exhausted.
+
+        An async generator is finalized by the loop that first advances it,
+        so generators over shared-loop resources must only ever be advanced
+        through ``anext`` and ``iterate``. Awaiting ``__anext__`` directly
+        on a per-request loop would have that loop close the generator, and
+        its scroll, as soon as the view returns.
+        """
+        item = await self.run(_anext(async_gen), timeout)
+        return default if item is _END else item
+
+    def iterate(self, async_gen, timeout=None):
+        """Drive an async generator on the shared loop from synchronous code."""
+        try:
+            while True:
+                item = self.submit(_anext(async_gen), timeout).result()
+                if item is _END:
+                    return
+                yield item
+        finally:
+            self.submit(_aclose(async_gen), timeout).result()
+
+
+class AsyncElasticsearchBackend(ElasticsearchBackend):
+    """``ElasticsearchBackend`` variant built on ``AsyncElasticsearch``.
+
+    Query building and alert transformation are inherited; the data access
+    methods are coroutines (``iter_alert_pages`` is an async generator) that
+    must run on ``self.runner``'s loop.
+    """
+
+    def __init__(self, hosts=None, page_size=SCROLL_PAGE_SIZE, settings=None, breaker=None):
+        self.settings = settings or ElasticsearchSettings.from_env()
+        self.hosts = hosts or self.settings.hosts
+        self.breaker = breaker or CircuitBreaker(self.settings.breaker_failures, self.settings.breaker_reset_timeout)
+        self._es = None
+        self._es_lock = threading.Lock()
+        self._open_scrolls = set()
+        self._scrolls_lock = threading.Lock()
+        self.page_size = page_size
+        self.runner = EventLoopThread()
+
+    def connect_to_elasticsearch(self, hosts):
+        # Uses settings.async_request_timeout: interactive requests should
+        # fail fast rather than wait out the sync client's timeout.
+        return create_async_client(hosts, self.settings, self.breaker)
+
+    def close(self, timeout=10):
+        """Clear open scroll contexts, close the client's sessions and stop the event loop."""
+        if self.runner.loop is None:
+            return
+        try:
+            self.runner.submit(self._close(), timeout).result()
+        except Exception as e:
+            logging.error(f"Error closing async Elasticsearch client: {e}")
+        self.runner.stop()
+
+    async def _close(self):
+        scroll_ids = self._take_open_scrolls()
+        if scroll_ids:
+            try:
+                with es_call('clear_scroll'):
+                    await self.es.clear_scroll(scroll_id=scroll_ids)
+                logging.info(f"Cleared {len(scroll_ids)} open async scroll contexts")
+            except Exception as e:
+                logging.error(f"Error clearing scroll contexts on shutdown: {e}")
+        if self._es is not None:
+            await self._es.close()
+
+    async def iter_alert_pages(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", all_fields=False, filters=None):
+        query = self.build_alert_query(responder_name, start_date, end_date, start_time, end_time, filters=filters)
+        query["sort"] = [{CREATED_AT_TIME_FIELD: "asc"}]
+        if not all_fields:
+            query["_source"] = SOURCE_FIELDS
+        logging.info(f"query:{query}")
+
+        scroll_id = None
+        try:
+            with es_call('search'):
+                page = await self.es.search(index=ALERT_INDEX, body=query, scroll=SCROLL_TIMEOUT, size=self.page_size)
+            scroll_id = page.get('_scroll_id')
+            self._track_scroll(None, scroll_id)
+            while page['hits']['hits']:
+                yield [hit["_source"] for hit in page['hits']['hits']]
+                with es_call('scroll'):
+                    page = await self.es.scroll(scroll_id=scroll_id, scroll=SCROLL_TIMEOUT)
+                previous_scroll_id, scroll_id = scroll_id, page.get('_scroll_id', scroll_id)
+                if scroll_id != previous_scroll_id:
+                    self._track_scroll(previous_scroll_id, scroll_id)
+        finally:
+            if scroll_id:
+                self._track_scroll(scroll_id, None)
+                try:
+                    with es_call('clear_scroll'):
+                        await self.es.clear_scroll(scroll_id=scroll_id)
+                except Exception as e:
+                    logging.error(f"Error clearing scroll context: {e}")
+
+    async def get_alerts(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", all_fields=False, filters=None):
+        all_alerts = []
+        async for page in self.iter_alert_pages(responder_name, start_date, end_date, start_time, end_time, all_fields, filters):
+            all_alerts.extend(page)
+        return all_alerts
+
+    async def fetch_unique_responder_names(self):
+        unique_names = []
+        after_key = None
+        while True:
+            with es_call('search'):
+                response = await self.es.search(index=ALERT_INDEX, body=self.build_responder_names_query(after_key))
+            names, after_key = self.parse_responder_names_page(response)
+            unique_names.extend(names)
+            if not after_key:
+                return unique_names
+
+    async def get_unique_responder_names(self):
+        return await self.fetch_unique_responder_names()
@@ -0,0 +1,387 @@
+"""Local stand-in for the Elasticsearch endpoints the backend uses.
+
+Serves a ``SyntheticAlerts`` corpus over HTTP with enough of the search API
+for benchmarks: ``_search`` (with ``scroll``, ``slice``, ``sort``, ``size``,
+``_source`` includes and ``docvalue_fields``), ``_search/scroll`` and clearing
+scrolls. Queries support ``bool`` (``must``/``filter``/``should``/
+``must_not``), ``term``, ``terms``, ``range``, ``exists`` and ``match_all``.
+The ``createdAtTime`` range and a team ``term`` are answered arithmetically
+from the corpus layout, so large corpora are never materialised.
+
+    python -m benchmarks.fake_es --count 100000 --port 9250
+"""
+from datetime import datetime, timezone
+from fnmatch import fnmatchcase
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import argparse
+import itertools
+import json
+import threading
+import uuid
+
+from benchmarks.synthetic import SyntheticAlerts, format_created_at_time
+
+
+CREATED_AT_TIME_FIELD = 'parsedMessage.attributes.createdAtTime'
+RESPONDER_NAME_FIELD = 'parsedMessage.attributes.responders.name'
+ES_VERSION = '7.17.9'
+
+
+def _to_millis(value):
+    if isinstance(value, (int, float)):
+        return int(value)
+    for fmt in ('%Y/%m/%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S.%fZ', '%Y-%m-%dT%H:%M:%SZ', '%Y-%m-%d'):
+        try:
+            parsed = datetime.strptime(value, fmt).replace(tzinfo=timezone.utc)
+            return int(parsed.timestamp() * 1000)
+        except ValueError:
+            pass
+    return int(float(value))
+
+
+def _field(name):
+    return name[:-len('.keyword')] if name.endswith('.keyword') else name
+
+
+def _values(doc, path):
+    nodes = [doc]
+    for part in path.split('.'):
+        found = []
+        for node in nodes:
+            if isinstance(node, dict) and part in node:
+                value = node[part]
+                found.extend(value if isinstance(value, list) else [value])
+        nodes = found
+    return [node for node in nodes if node is not None and not isinstance(node, dict)]
+
+
+def _comparable(field, value):
+    return _to_millis(value) if field.endswith(('Time', 'At')) or field == '@timestamp' else value
+
+
+def _matches(doc, clause):
+    if not clause or 'match_all' in clause:
+        return True
+    if 'bool' in clause:
+        query = clause['bool']
+        as_list = lambda v: v if isinstance(v, list) else [v]
+        if not all(_matches(doc, c) for c in as_list(query.get('must', [])) + as_list(query.get('filter', []))):
+            return False
+        if any(_matches(doc, c) for c in as_list(query.get('must_not', []))):
+            return False
+        should = as_list(query.get('should', []))
+        return not should or any(_matches(doc, c) for c in should)
+    if 'term' in clause:
+        field, value = next(iter(clause['term'].items()))
+        value = value.get('value') if isinstance(value, dict) else value
+        return value in _values(doc, _field(field))
+    if 'terms' in clause:
+        field, values = next(iter(clause['terms'].items()))
+        return bool(set(map(str, values)) & set(map(str, _values(doc, _field(field)))))
+    if 'exists' in clause:
+        return bool(_values(doc, _field(clause['exists']['field'])))
+    if 'range' in clause:
+        field, bounds = next(iter(clause['range'].items()))
+        field = _field(field)
+        for value in _values(doc, field):
+            value = _comparable(field, value)
+            if all(op not in bounds or check(value, _comparable(field, bounds[op]))
+                   for op, check in (('gte', lambda a, b: a >= b), ('gt', lambda a, b: a > b),
+                                     ('lte', lambda a, b: a <= b), ('lt', lambda a, b: a < b))):
+                return True
+        return False
+    raise ValueError(f"Unsupported query clause: {list(clause)}")
+
+
+class _SourceFilter:
+    """``_source`` includes filter; the include/descend/drop decision is memoised per field path."""
+
+    INCLUDE, DESCEND, DROP = range(3)
+
+    def __init__(self, includes):
+        self.includes = includes
+        self._actions = {}
+
+    def _action(self, path):
+        action = self._actions.get(path)
+        if action is None:
+            if any(fnmatchcase(path, pattern) for pattern in self.includes):
+                action = self.INCLUDE
+            elif any(self._may_include_below(path, pattern) for pattern in self.includes):
+                action = self.DESCEND
+            else:
+                action = self.DROP
+            self._actions[path] = action
+        return action
+
+    @staticmethod
+    def _may_include_below(path, pattern):
+        literal = pattern.split('*')[0]
+        return literal.startswith(path + '.') or ('*' in pattern and (path + '.').startswith(literal))
+
+    def apply(self, node, prefix=''):
+        out = {}
+        for key, value in node.items():
+            path = f"{prefix}{key}"
+            action = self._action(path)
+            if action == self.INCLUDE:
+                out[key] = value
+            elif action == self.DESCEND:
+                if isinstance(value, dict):
+                    value = self.apply(value, path + '.')
+                elif isinstance(value, list):
+                    value = [item for item in (self.apply(item, path + '.') for item in value if isinstance(item, dict)) if item]
+                else:
+                    continue
+                if value:
+                    out[key] = value
+        return out
+
+
+class _MetricAggs:
+    """``min`` and ``max`` metric aggregations over numeric fields."""
+
+    def __init__(self, aggs):
+        self.aggs = {name: (kind, spec['field']) for name, agg in aggs.items()
+                     for kind, spec in agg.items() if kind in ('min', 'max')}
+        self.values = dict.fromkeys(self.aggs)
+
+    def __bool__(self):
+        return bool(self.aggs)
+
+    def add(self, doc):
+        for name, (kind, field) in self.aggs.items():
+            for value in _values(doc, _field(field)):
+                value = _to_millis(value)
+                current = self.values[name]
+                if value is not None and (current is None or (value < current if kind == 'min' else value > current)):
+                    self.values[name] = value
+
+    def result(self):
+        return {name: {'value': None if value is None else float(value)} for name, value in self.values.items()}
+
+
+def _is_descending(sort):
+    # Documents are stored in createdAt order; only the direction matters
+    for spec in sort:
+        if isinstance(spec, dict):
+            order = next(iter(spec.values()))
+            return (order.get('order') if isinstance(order, dict) else order) == 'desc'
+    return False
+
+
+class FakeElasticsearch:
+    """In-process search engine over a ``SyntheticAlerts`` corpus."""
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+        self.scrolls = {}
+        self.lock = threading.Lock()
+        self.stats = {'search': 0, 'scroll': 0, 'clear_scroll': 0}
+        self._source_filters = {}
+
+    def _plan(self, query):
+        """Split ``query`` into an index range answered from the corpus layout and the clauses left to evaluate per doc."""
+        gte = lt = None
+        team = None
+        bool_query = (query or {}).get('bool')
+        if bool_query is None:
+            return range(self.corpus.count), query
+        residual = []
+        for clause in list(bool_query.get('must', [])) + list(bool_query.get('filter', [])):
+            if 'range' in clause and CREATED_AT_TIME_FIELD in clause['range']:
+                bounds = clause['range'][CREATED_AT_TIME_FIELD]
+                if 'gte' in bounds:
+                    gte = _to_millis(bounds['gte'])
+                if 'gt' in bounds:
+                    gte = _to_millis(bounds['gt']) + 1
+                if 'lt' in bounds:
+                    lt = _to_millis(bounds['lt'])
+                if 'lte' in bounds:
+                    lt = _to_millis(bounds['lte']) + 1
+                continue
+            if 'term' in clause and _field(next(iter(clause['term']))) == RESPONDER_NAME_FIELD and team is None:
+                team = self.corpus.team_index(next(iter(clause['term'].values())))
+                if team is not None:
+                    continue
+            residual.append(clause)
+        residual_query = {'bool': dict(bool_query, must=[], filter=residual)}
+
+        lo, hi = self.corpus.index_range(gte, lt)
+        if team is None:
+            return range(lo, hi), residual_query
+        teams = len(self.corpus.teams)
+        return range(lo + (team - lo) % teams, hi, teams), residual_query
+
+    def _iter_matches(self, body):
+        candidates, query = self._plan(body.get('query'))
+        slice_spec = body.get('slice')
+        if slice_spec:
+            candidates = candidates[slice_spec['id']::slice_spec['max']]
+        if _is_descending(body.get('sort') or []):
+            candidates = reversed(candidates)
+        for i in candidates:
+            doc = self.corpus.doc(i)
+            if _matches(doc, query):
+                yield i, doc
+
+    def _hit(self, i, doc, body):
+        source = body.get('_source', True)
+        if isinstance(source, dict):
+            source = source.get('includes', True)
+        if isinstance(source, str):
+            source = [source]
+        if isinstance(source, list):
+            key = tuple(source)
+            if key not in self._source_filters:
+                self._source_filters[key] = _SourceFilter(source)
+            doc = self._source_filters[key].apply(doc)
+        hit = {'_index': 'entity.alert', '_type': '_doc', '_id': f"alert-{i}", '_score': None,
+               '_source': doc,
+               'sort': [self.corpus.created_at(i)]}
+        if body.get('docvalue_fields'):
+            hit['fields'] = {CREATED_AT_TIME_FIELD: [format_created_at_time(self.corpus.created_at(i))]}
+        return hit
+
+    def search(self, body, params):
+        self.stats['search'] += 1
+        size = int(params.get('size', body.get('size', 10)))
+        matches = self._iter_matches(body)
+        total = None
+        if 'scroll' not in params:
+            aggs = _MetricAggs(body.get('aggs') or body.get('aggregations') or {})
+            hits = []
+            for i, doc in itertools.islice(matches, size):
+                aggs.add(doc)
+                hits.append(self._hit(i, doc, body))
+            if body.get('track_total_hits') or size == 0 or aggs:
+                total = len(hits)
+                for i, doc in matches:
+                    aggs.add(doc)
+                    total += 1
+            page = self._page(hits, total)
+            if aggs:
+                page['aggregations'] = aggs.result()
+            return page
+        # Like ES, scrolls always count every hit and refuse to limit that
+        if body.get('track_total_hits', True) is not True:
+            raise ValueError("disabling [track_total_hits] is not allowed in a scroll context")
+        total = sum(1 for _ in self._iter_matches(body))
+        scroll_id = uuid.uuid4().hex
+        with self.lock:
+            self.scrolls[scroll_id] = (matches, body, size)
+        return self.scroll(scroll_id, count=False, total=total)
+
+    def scroll(self, scroll_id, count=True, total=None):
+        if count:
+            self.stats['scroll'] += 1
+        with self.lock:
+            state = self.scrolls.get(scroll_id)
+        if state is None:
+            raise KeyError(scroll_id)
+        matches, body, size = state
+        hits = [self._hit(i, doc, body) for i, doc in itertools.islice(matches, size)]
+        page = self._page(hits, total)
+        page['_scroll_id'] = scroll_id
+        return page
+
+    def clear_scroll(self, scroll_ids):
+        self.stats['clear_scroll'] += 1
+        with self.lock:
+            for scroll_id in scroll_ids:
+                self.scrolls.pop(scroll_id, None)
+        return {'succeeded': True, 'num_freed': len(scroll_ids)}
+
+    def _page(self, hits, total=None):
+        return {'took': 0, 'timed_out': False, '_shards': {'total': 1, 'successful': 1, 'skipped': 0, 'failed': 0},
+                'hits': {'total': {'value': len(hits) if total is None else total, 'relation': 'eq'}, 'max_score': None, 'hits': hits}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    engine = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload=None):
+        body = b'' if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('X-Elastic-Product', 'Elasticsearch')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+    def _dispatch(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        path = url.path.rstrip('/')
+        try:
+            if path == '':
+                return self._send(200, {'name': 'fake-es', 'cluster_name': 'benchmark', 'tagline': 'You Know, for Search',
+                                        'version': {'number': ES_VERSION, 'build_flavor': 'default'}})
+            if path == '/_search/scroll':
+                body = self._body()
+                if self.command == 'DELETE':
+                    scroll_ids = body.get('scroll_id', params.get('scroll_id', []))
+                    return self._send(200, self.engine.clear_scroll(scroll_ids if isinstance(scroll_ids, list) else [scroll_ids]))
+                return self._send(200, self.engine.scroll(body.get('scroll_id') or params['scroll_id']))
+            if path.endswith('/_search'):
+                return self._send(200, self.engine.search(self._body(), params))
+            return self._send(404, {'error': f"unsupported endpoint {self.command} {url.path}"})
+        except KeyError as e:
+            return self._send(404, {'error': {'type': 'search_context_missing_exception', 'reason': str(e)}, 'status': 404})
+        except ValueError as e:
+            return self._send(400, {'error': {'type': 'parsing_exception', 'reason': str(e)}, 'status': 400})
+
+    do_GET = do_POST = do_DELETE = do_HEAD = _dispatch
+
+
+class FakeElasticsearchServer:
+    """Runs ``FakeElasticsearch`` on a local port in a background thread."""
+
+    def __init__(self, corpus, host='127.0.0.1', port=0):
+        self.engine = FakeElasticsearch(corpus)
+        handler = type('Handler', (_Handler,), {'engine': self.engine})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='fake-es', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--span-days', type=float, default=30)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9250)
+    args = parser.parse_args()
+    server = FakeElasticsearchServer(SyntheticAlerts(args.count, span_days=args.span_days), args.host, args.port)
+    print(f"Serving {args.count} synthetic alerts at {server.url}")
+    server.httpd.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+"""Throughput, latency and peak-memory benchmarks for the alert pipeline.
+
+Each stage is run once per corpus size against synthetic alerts:
+
+* ``generate``        building the synthetic documents themselves (baseline)
+* ``flatten_json``    ``ElasticsearchBackend.flatten_json`` on projected docs
+* ``map_field_names`` ``map_field_names`` on already flattened docs
+* ``legacy``          ``flatten_json`` + ``map_field_names`` (the old CSV path)
+* ``transform``       the compiled ``transform_alerts`` page transformer
+* ``records``         ``transform_records``, the same mapping into compact records
+* ``get_alerts[N]``   ``iter_alert_pages`` against a local fake ES with N slices
+* ``GET /...``        the Flask endpoints through the test client
+
+Latency percentiles are per page of ``--page-size`` alerts for the
+in-process stages, and per request for the endpoints. Peak memory is taken
+with ``tracemalloc`` in a second, separate run of each stage so tracing does
+not skew the timings.
+
+    python -m benchmarks.run --sizes 1000 100000 --json bench.json
+"""
+from datetime import datetime, timedelta, timezone
+import argparse
+import gc
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+from elasticsearch import Elasticsearch
+
+from benchmarks.fake_es import FakeElasticsearchServer, _SourceFilter
+from benchmarks.synthetic import SyntheticAlerts, DEFAULT_TEAMS
+from e2 import ElasticsearchBackend, SOURCE_FIELDS
+from cache import CoalescingAlertSource
+
+
+DEFAULT_SIZES = [1000, 100000]
+PAGE_SIZE = 1000
+RESPONDER = DEFAULT_TEAMS[0]
+ENDPOINTS = [
+    ('/alerts', {}),
+    ('/alerts', {'format': 'ndjson'}),
+    ('/alerts_csv', {}),
+]
+
+
+class BenchBackend(ElasticsearchBackend):
+    """``ElasticsearchBackend`` wired to an existing client instead of connecting at init."""
+
+    def __init__(self, es, page_size=PAGE_SIZE, slices=1):
+        self.connect_to_elasticsearch = lambda hosts: es
+        super().__init__(None, page_size=page_size, slices=slices)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(name, size, items, elapsed, latencies, peak_bytes=None):
+    latencies = sorted(latencies)
+    return {
+        'stage': name,
+        'size': size,
+        'items': items,
+        'seconds': round(elapsed, 4),
+        'items_per_sec': round(items / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p90_ms': round(percentile(latencies, 90) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'peak_mb': round(peak_bytes / 2 ** 20, 2) if peak_bytes is not None else None,
+    }
+
+
+def measure(run):
+    """Run ``run()``, which yields ``(items, seconds)`` per unit of work.
+
+    Only the yielded durations count, so preparing the input of each unit
+    (generating and projecting synthetic pages) is excluded.
+    """
+    gc.collect()
+    items, latencies = 0, []
+    for count, seconds in run():
+        items += count
+        latencies.append(seconds)
+    return items, sum(latencies), latencies
+
+
+def measure_peak(run):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for _ in run():
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+class Benchmarks:
+    def __init__(self, size, page_size=PAGE_SIZE, track_memory=True, repeat=3, cached=False):
+        self.size = size
+        self.page_size = page_size
+        self.track_memory = track_memory
+        self.repeat = repeat
+        self.cached = cached
+        # One team in len(teams) is the benchmarked responder, so it owns `size` alerts
+        self.corpus = SyntheticAlerts(size * len(DEFAULT_TEAMS))
+        self.source_filter = _SourceFilter(SOURCE_FIELDS)
+        self.transformer = BenchBackend(None)
+        self.window = self._window()
+
+    def _window(self):
+        start = datetime.fromtimestamp(self.corpus.start_ms / 1000, timezone.utc)
+        end = datetime.fromtimestamp(self.corpus.created_at(self.corpus.count - 1) / 1000 + 1, timezone.utc)
+        end = max(end, start + timedelta(seconds=1))
+        return {
+            'start_date': start.strftime('%Y-%m-%d'), 'start_time': start.strftime('%H:%M:%S'),
+            'end_date': end.strftime('%Y-%m-%d'), 'end_time': end.strftime('%H:%M:%S'),
+        }
+
+    def _responder_pages(self, project=True):
+        """Pages of the benchmarked responder's docs, as the backend would receive them."""
+        team_count = len(self.corpus.teams)
+        page = []
+        for i in range(0, self.corpus.count, team_count):
+            doc = self.corpus.doc(i)
+            page.append(self.source_filter.apply(doc) if project else doc)
+            if len(page) == self.page_size:
+                yield page
+                page = []
+        if page:
+            yield page
+
+    def _timed_pages(self, fn, pages):
+        def run():
+            for page in pages():
+                start = time.perf_counter()
+                fn(page)
+                yield len(page), time.perf_counter() - start
+        return run
+
+    def _stage(self, name, run):
+        items, elapsed, latencies = measure(run)
+        peak = measure_peak(run) if self.track_memory else None
+        return summarize(name, self.size, items, elapsed, latencies, peak)
+
+    def run_transforms(self):
+        backend = self.transformer
+
+        def generate():
+            team_count = len(self.corpus.teams)
+            for first in range(0, self.corpus.count, team_count * self.page_size):
+                start = time.perf_counter()
+                count = 0
+                for i in range(first, min(self.corpus.count, first + team_count * self.page_size), team_count):
+                    self.corpus.doc(i)
+                    count += 1
+                yield count, time.perf_counter() - start
+
+        def flattened_pages():
+            for page in self._responder_pages():
+                yield [backend.flatten_json(alert) for alert in page]
+
+        yield self._stage('generate', generate)
+        yield self._stage('flatten_json', self._timed_pages(
+            lambda page: [backend.flatten_json(alert) for alert in page], self._responder_pages))
+        yield self._stage('map_field_names', self._timed_pages(
+            lambda page: [backend.map_field_names(flat) for flat in page], flattened_pages))
+        yield self._stage('legacy', self._timed_pages(
+            lambda page: [backend.map_field_names(backend.flatten_json(alert)) for alert in page], self._responder_pages))
+        yield self._stage('transform', self._timed_pages(backend.transform_alerts, self._responder_pages))
+        yield self._stage('records', self._timed_pages(backend.transform_records, self._responder_pages))
+
+    def run_retrieval(self, server, slice_counts=(1, 4)):
+        for slices in slice_counts:
+            backend = BenchBackend(Elasticsearch([server.url], timeout=300), self.page_size, slices)
+
+            def run():
+                pages = backend.iter_alert_pages(RESPONDER, **self.window)
+                try:
+                    while True:
+                        start = time.perf_counter()
+                        page = next(pages, None)
+                        if page is None:
+                            return
+                        yield len(page), time.perf_counter() - start
+                finally:
+                    pages.close()
+
+            try:
+                yield self._stage(f"get_alerts[{slices}]", run)
+            finally:
+                backend.executor.shutdown(wait=False)
+
+    def run_endpoints(self, server):
+        os.environ.setdefault('ES_HOSTS', server.url)
+        try:
+            import app as app_module
+        except (ImportError, SyntaxError) as e:
+            logging.error(f"Skipping endpoint benchmarks, app could not be imported: {e}")
+            return
+
+        app_module.es_backend.es = Elasticsearch([server.url], timeout=300)
+        if not self.cached:
+            # Keep the interface the views use, minus any local store or window rounding
+            app_module.alert_source = CoalescingAlertSource(app_module.es_backend, app_module.es_backend, timedelta(0))
+        client = app_module.app.test_client()
+
+        for path, params in ENDPOINTS:
+            query = dict(self.window, responder_name=RESPONDER, **params)
+
+            def run():
+                for _ in range(self.repeat):
+                    start = time.perf_counter()
+                    response = client.get(path, query_string=query)
+                    body = response.get_data()
+                    if response.status_code != 200:
+                        raise RuntimeError(f"{path} returned {response.status_code}: {body[:200]!r}")
+                    yield self.size, time.perf_counter() - start
+
+            label = f"GET {path}" + (f"?format={params['format']}" if 'format' in params else '')
+            yield self._stage(label, run)
+
+
+def print_row(result):
+    peak = f"{result['peak_mb']:>9.2f}" if result['peak_mb'] is not None else f"{'-':>9}"
+    print(f"{result['stage']:<24}{result['size']:>9}{result['seconds']:>10.3f}{result['items_per_sec'] or 0:>14.1f}"
+          f"{result['p50_ms']:>11.3f}{result['p90_ms']:>11.3f}{result['p99_ms']:>11.3f}{peak}")
+    sys.stdout.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="alerts per responder")
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE)
+    parser.add_argument('--stages', nargs='+', choices=['transform', 'retrieval', 'endpoints'],
+                        default=['transform', 'retrieval', 'endpoints'])
+    parser.add_argument('--repeat', type=int, default=3, help="requests per endpoint")
+    parser.add_argument('--cached', action='store_true', help="benchmark endpoints through the app's alert cache")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc peak-memory runs")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    print(f"{'stage':<24}{'size':>9}{'seconds':>10}{'items/s':>14}{'p50 ms':>11}{'p90 ms':>11}{'p99 ms':>11}{'peak MB':>9}")
+
+    results = []
+    for size in args.sizes:
+        bench = Benchmarks(size, args.page_size, not args.no_memory, args.repeat, args.cached)
+        suites = []
+        if 'transform' in args.stages:
+            suites.append(lambda server: bench.run_transforms())
+        if 'retrieval' in args.stages:
+            suites.append(bench.run_retrieval)
+        if 'endpoints' in args.stages:
+            suites.append(bench.run_endpoints)
+
+        with FakeElasticsearchServer(bench.corpus) as server:
+            for suite in suites:
+                for result in suite(server):
+                    results.append(result)
+                    print_row(result)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
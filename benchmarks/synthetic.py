@@ -0,0 +1,128 @@
+"""Deterministic synthetic ``entity.alert`` documents for benchmarks.
+
+Every document is a pure function of its index, so a corpus of any size can
+be served without holding it in memory. Documents are ordered by
+``createdAt``: alert ``i`` is created ``i * step_ms`` after ``start_ms``, and
+its primary responder team is ``teams[i % len(teams)]``.
+"""
+from datetime import datetime, timezone
+import json
+import random
+
+
+DEFAULT_TEAMS = [
+    'olympus_middleware_sre', 'olympus_platform_sre', 'payments_oncall', 'cards_core',
+    'ledger_sre', 'identity_oncall', 'notifications_sre', 'data_platform',
+]
+SERVICES = ['card-auth', 'ledger-writer', 'kyc-gateway', 'notification-hub', 'txn-router', 'settlement', 'risk-engine']
+CLUSTERS = ['olympus-prod-1', 'olympus-prod-2', 'olympus-dr', 'athena-prod']
+PRIORITIES = ['P1', 'P2', 'P3', 'P4', 'P5']
+PRIORITY_WEIGHTS = [2, 8, 30, 40, 20]
+STATUSES = ['closed', 'open']
+ZONES = ['ap-south-1a', 'ap-south-1b', 'ap-south-1c']
+BUS = ['payments', 'cards', 'platform', 'lending']
+ALERT_TYPES = ['prometheus', 'cloudwatch', 'synthetics', 'apm']
+TAGS = ['critical', 'k8s', 'latency', 'error-rate', 'db', 'kafka', 'customer-impact', 'infra', 'paging']
+PEOPLE = ['asha', 'bharat', 'chitra', 'dev', 'esha', 'farhan', 'gita', 'hari', 'isha', 'jay']
+
+CREATED_AT_TIME_FORMAT = '%Y/%m/%d %H:%M:%S'
+
+
+def format_created_at_time(millis):
+    return datetime.fromtimestamp(millis / 1000.0, timezone.utc).strftime(CREATED_AT_TIME_FORMAT)
+
+
+class SyntheticAlerts:
+    """A virtual corpus of ``count`` alerts spread evenly over ``span_days``."""
+
+    def __init__(self, count, start_ms=1704067200000, span_days=30, teams=None, seed=7):
+        self.count = count
+        self.start_ms = start_ms
+        self.step_ms = max(1, int(span_days * 86400 * 1000 / max(count, 1)))
+        self.teams = list(teams or DEFAULT_TEAMS)
+        self.seed = seed
+
+    def created_at(self, i):
+        return self.start_ms + i * self.step_ms
+
+    def index_range(self, gte_ms=None, lt_ms=None):
+        """Indices of the alerts created in ``[gte_ms, lt_ms)``."""
+        lo = 0 if gte_ms is None else max(0, -(-(gte_ms - self.start_ms) // self.step_ms))
+        hi = self.count if lt_ms is None else min(self.count, max(0, -(-(lt_ms - self.start_ms) // self.step_ms)))
+        return lo, hi
+
+    def team_index(self, name):
+        try:
+            return self.teams.index(name)
+        except ValueError:
+            return None
+
+    def doc(self, i):
+        rng = random.Random(self.seed * 1000003 + i)
+        created = self.created_at(i)
+        team = self.teams[i % len(self.teams)]
+        status = 'closed' if rng.random() < 0.85 else 'open'
+        acknowledged = status == 'closed' or rng.random() < 0.5
+        ack_delay = int(rng.expovariate(1 / 240000))
+        close_delay = ack_delay + int(rng.expovariate(1 / 1800000))
+        updated = created + (close_delay if status == 'closed' else ack_delay if acknowledged else 0)
+        alert_id = f"{rng.getrandbits(64):016x}-{i}"
+        service = rng.choice(SERVICES)
+        primary, secondary = rng.sample(PEOPLE, 2)
+
+        responders = [{
+            'type': 'team',
+            'name': team,
+            'id': f"team-{i % len(self.teams)}",
+            'onCalls': [
+                {'name': f"{team}_schedule", 'contacts': [{'emailId': f"{primary}@example.com", 'method': 'email'}]},
+                {'name': f"{team}_schedule_secondary", 'contacts': [{'emailId': f"{secondary}@example.com", 'method': 'email'}]},
+            ],
+        }]
+        if i % 11 == 0:
+            responders.append({'type': 'user', 'name': f"{primary}@example.com", 'id': f"user-{primary}", 'onCalls': []})
+
+        attributes = {
+            'alertId': alert_id,
+            'tinyId': str(100000 + i),
+            'message': f"[{service}] {rng.choice(['High error rate', 'Latency above SLO', 'Pod restarts', 'Consumer lag', 'Disk pressure'])}",
+            'description': 'Alert generated by the synthetic benchmark corpus. ' * rng.randint(1, 6),
+            'alias': f"{service}-{rng.randint(1, 50)}",
+            'cluster': rng.choice(CLUSTERS),
+            'service': service,
+            'priority': rng.choices(PRIORITIES, PRIORITY_WEIGHTS)[0],
+            'alertType': rng.choice(ALERT_TYPES),
+            'status': status,
+            'severity': rng.choice(['critical', 'high', 'warning']),
+            'createdAt': created,
+            'updatedAt': updated,
+            'createdAtTime': format_created_at_time(created),
+            'acknowledged': acknowledged,
+            'acknowledgedBy': f"{primary}@example.com" if acknowledged else None,
+            'alertAckTime': created + ack_delay if acknowledged else None,
+            'closedBy': f"{secondary}@example.com" if status == 'closed' else None,
+            'alertCloseTime': created + close_delay if status == 'closed' else None,
+            'timeTakenToClose': close_delay if status == 'closed' else None,
+            'responders': responders,
+            'runbook_url': f"https://runbooks.example.com/{service}",
+            'zoneId': rng.choice(ZONES),
+            'bu': rng.choice(BUS),
+            'count': rng.randint(1, 40),
+            'tags': rng.sample(TAGS, rng.randint(0, 4)),
+            'details': {f"label_{k}": f"value-{rng.getrandbits(24):06x}" for k in range(rng.randint(3, 10))},
+            'integration': {'name': rng.choice(ALERT_TYPES), 'type': 'API', 'id': f"int-{rng.randint(1, 9)}"},
+            'actions': ['restart', 'page'] if rng.random() < 0.3 else [],
+        }
+        # Unset fields are absent from the indexed documents rather than null
+        attributes = {key: value for key, value in attributes.items() if value is not None}
+        parsed_message = {'level': 'INFO', 'logger': 'opsgenie-webhook', 'attributes': attributes}
+        return {
+            '@timestamp': format_created_at_time(updated),
+            'message': json.dumps(parsed_message)[:1024],
+            'parsedMessage': parsed_message,
+            'kubernetes': {'namespace': 'alerting', 'pod': f"webhook-{i % 4}", 'labels': {'app': 'opsgenie-webhook'}},
+        }
+
+    def docs(self, count=None):
+        for i in range(self.count if count is None else min(count, self.count)):
+            yield self.doc(i)
@@ -0,0 +1,533 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import logging
+import threading
+import time
+
+import pytz
+
+from e2 import timeline_interval, alert_attributes, epoch_millis, ResultFingerprint, INDEX_LAG_MS, TIMELINE_MAX_BUCKETS
+from metrics import COALESCED_REQUESTS, RequestTimings, current_timings
+
+
+IST = pytz.timezone('Asia/Kolkata')
+WINDOW_FORMAT = '%Y-%m-%d %H:%M:%S'
+EPOCH = datetime(1970, 1, 1)
+
+# A projected alert _source is about 6 KB of Python objects, so the default
+# bucket cache holds roughly 120 MB per process (and each gunicorn worker
+# has its own).
+DEFAULT_MAX_ALERTS = 20000
+
+
+def _now_ist():
+    return datetime.now(IST).replace(tzinfo=None)
+
+
+def _parse_window(start_date, end_date, start_time, end_time):
+    if not start_date:
+        start_date = datetime.utcnow().strftime("%Y-%m-%d")
+    if not end_date:
+        end_date = start_date
+    try:
+        start = datetime.strptime(f"{start_date} {start_time}", WINDOW_FORMAT)
+        end = datetime.strptime(f"{end_date} {end_time}", WINDOW_FORMAT)
+    except ValueError:
+        return None
+    return start, end
+
+
+def _floor(dt, bucket_size):
+    size = int(bucket_size.total_seconds())
+    seconds = int((dt - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=seconds - seconds % size)
+
+
+def _contiguous_runs(bucket_starts, bucket_size):
+    """Group sorted bucket starts into runs of adjacent buckets, each fetched with one query."""
+    runs = []
+    for bucket_start in bucket_starts:
+        if runs and runs[-1][-1] + bucket_size == bucket_start:
+            runs[-1].append(bucket_start)
+        else:
+            runs.append([bucket_start])
+    return runs
+
+
+class _Bucket:
+    __slots__ = ('alerts', 'size', 'sealed', 'watermark', 'refreshed_at')
+
+    def __init__(self, alerts, watermark, refreshed_at):
+        self.alerts = alerts
+        self.size = 0
+        self.sealed = False
+        self.watermark = watermark
+        self.refreshed_at = refreshed_at
+
+
+class BucketedAlertCache:
+    """Time-bucketed cache in front of ``ElasticsearchBackend`` alert queries.
+
+    Windows are split into aligned buckets (one hour by default) keyed by
+    responder. Whole buckets are served from memory; only the partial
+    buckets at the edges of the window are fetched directly. Filtered
+    queries bypass the cache: the refresh only sees alerts that still match,
+    so an alert that stopped matching would never leave a cached bucket. A bucket is
+    sealed, and never refetched, once it is older than ``settle_after`` and
+    all of its alerts are closed. Buckets that are not sealed yet are
+    refreshed with an ``updatedAt >= watermark`` query and merged by alert
+    id. The cache is bounded by the total number of alerts held, evicting
+    the least recently used buckets first. Every bucket of a window is
+    loaded before the first page is yielded, so streamed responses read
+    from the backend directly.
+
+    Other attributes are delegated to the wrapped backend.
+    """
+
+    def __init__(self, backend, bucket_size=timedelta(hours=1), settle_after=timedelta(days=1),
+                 refresh_interval=15, max_alerts=DEFAULT_MAX_ALERTS, now=_now_ist):
+        self.backend = backend
+        self.bucket_size = bucket_size
+        self.settle_after = settle_after
+        self.refresh_interval = refresh_interval
+        self.max_alerts = max_alerts
+        self.now = now
+        self._buckets = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def get_alerts(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", all_fields=False, filters=None):
+        try:
+            return list(self.iter_alerts(responder_name, start_date, end_date, start_time, end_time, all_fields, filters))
+        except Exception as e:
+            logging.error(f"Error fetching alerts: {e}")
+            return []
+
+    def iter_alerts(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", all_fields=False, filters=None):
+        pages = self.iter_alert_pages(responder_name, start_date, end_date, start_time, end_time, all_fields, filters)
+        try:
+            for page in pages:
+                yield from page
+        finally:
+            pages.close()
+
+    def iter_alert_pages(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", all_fields=False, filters=None):
+        window = self._parse_window(start_date, end_date, start_time, end_time)
+        # Raw documents and filtered windows are never cached; unparseable windows go straight to ES
+        if all_fields or filters or window is None:
+            yield from self.backend.iter_alert_pages(responder_name, start_date, end_date, start_time, end_time, all_fields, filters=filters)
+            return
+
+        start, end = window
+        first_bucket = self._ceil(start)
+        last_bucket = self._floor(end)
+        if first_bucket >= last_bucket:
+            yield from self._fetch_direct(responder_name, start, end)
+            return
+
+        if start < first_bucket:
+            yield from self._fetch_direct(responder_name, start, first_bucket)
+
+        bucket_starts = []
+        bucket_start = first_bucket
+        while bucket_start < last_bucket:
+            bucket_starts.append(bucket_start)
+            bucket_start += self.bucket_size
+        for bucket in self._load_buckets(responder_name, bucket_starts):
+            if bucket.alerts:
+                yield bucket.alerts
+
+        if last_bucket < end:
+            yield from self._fetch_direct(responder_name, last_bucket, end)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._size = 0
+
+    def _parse_window(self, start_date, end_date, start_time, end_time):
+        return _parse_window(start_date, end_date, start_time, end_time)
+
+    def _floor(self, dt):
+        return _floor(dt, self.bucket_size)
+
+    def _ceil(self, dt):
+        floor = self._floor(dt)
+        return floor if floor == dt else floor + self.bucket_size
+
+    def _fetch_direct(self, responder_name, start, end):
+        return self.backend.iter_alert_pages(
+            responder_name, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'),
+            start.strftime('%H:%M:%S'), end.strftime('%H:%M:%S'))
+
+    def _fetch_hits(self, responder_name, start, end, updated_since=None):
+        """Group the hits of [start, end) by bucket start using their createdAtTime sort value."""
+        by_bucket = {}
+        hit_pages = self.backend.iter_alert_hit_pages(
+            responder_name, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'),
+            start.strftime('%H:%M:%S'), end.strftime('%H:%M:%S'), updated_since=updated_since)
+        try:
+            for hits in hit_pages:
+                for hit in hits:
+                    created = EPOCH + timedelta(milliseconds=hit['sort'][0])
+                    by_bucket.setdefault(self._floor(created), []).append(hit['_source'])
+        finally:
+            hit_pages.close()
+        return by_bucket
+
+    def _load_buckets(self, responder_name, bucket_starts):
+        now = self.now()
+        clock = time.time()
+        with self._lock:
+            entries = {}
+            for bucket_start in bucket_starts:
+                bucket = self._buckets.get((responder_name, bucket_start))
+                if bucket is not None:
+                    self._buckets.move_to_end((responder_name, bucket_start))
+                    entries[bucket_start] = bucket
+
+        missing = [b for b in bucket_starts if b not in entries]
+        stale = [b for b in bucket_starts if b in entries and not entries[b].sealed
+                 and clock - entries[b].refreshed_at >= self.refresh_interval]
+
+        # Contiguous runs of missing buckets are fetched with one query each
+        for run in _contiguous_runs(missing, self.bucket_size):
+            by_bucket = self._fetch_hits(responder_name, run[0], run[-1] + self.bucket_size)
+            for bucket_start in run:
+                alerts = by_bucket.get(bucket_start, [])
+                entries[bucket_start] = _Bucket(alerts, self._watermark(clock), clock)
+
+        # All stale buckets share a single incremental query
+        if stale:
+            updated_since = min(entries[b].watermark for b in stale)
+            by_bucket = self._fetch_hits(responder_name, stale[0], stale[-1] + self.bucket_size, updated_since)
+            for bucket_start in stale:
+                bucket = entries[bucket_start]
+                bucket.alerts = self._merge(bucket.alerts, by_bucket.get(bucket_start, []))
+                bucket.watermark = self._watermark(clock)
+                bucket.refreshed_at = clock
+
+        for bucket_start in missing + stale:
+            bucket = entries[bucket_start]
+            bucket.sealed = self._is_settled(bucket_start, bucket.alerts, now)
+            self._store((responder_name, bucket_start), bucket)
+
+        return [entries[b] for b in bucket_starts]
+
+    def _merge(self, alerts, updates):
+        if not updates:
+            return alerts
+        merged = {}
+        for alert in alerts + updates:
+            alert_id = alert_attributes(alert).get('alertId')
+            merged[alert_id if alert_id is not None else id(alert)] = alert
+        return sorted(merged.values(), key=lambda alert: epoch_millis(alert_attributes(alert).get('createdAt')) or 0)
+
+    def _watermark(self, clock):
+        return int(clock * 1000) - INDEX_LAG_MS
+
+    def _is_settled(self, bucket_start, alerts, now):
+        if bucket_start + self.bucket_size > now - self.settle_after:
+            return False
+        return all(alert_attributes(alert).get('status') == 'closed' for alert in alerts)
+
+    def _store(self, key, bucket):
+        with self._lock:
+            previous = self._buckets.pop(key, None)
+            if previous is not None:
+                self._size -= previous.size
+            bucket.size = max(len(bucket.alerts), 1)
+            self._buckets[key] = bucket
+            self._size += bucket.size
+            while self._size > self.max_alerts and len(self._buckets) > 1:
+                _, evicted = self._buckets.popitem(last=False)
+                self._size -= evicted.size
+
+
+class TimelineCache:
+    """Caches completed buckets of ``get_alert_timeline`` histograms.
+
+    A bucket is complete once it lies wholly inside the requested window
+    and ended more than ``INDEX_LAG_MS`` ago; such buckets are kept (LRU,
+    up to ``max_buckets``) per responder, interval, split and filter set, so a refresh
+    only asks ES for the runs of uncached buckets, usually just the current
+    one and a partial one at the window start. Counts split by a field
+    that changes after creation (Status), or filtered on any attribute, can
+    still move, so those buckets expire after ``mutable_ttl`` seconds.
+
+    Other attributes are delegated to the wrapped backend.
+    """
+
+    MUTABLE_SPLITS = {'Status'}
+
+    def __init__(self, backend, mutable_ttl=300, max_buckets=100000, now=_now_ist):
+        self.backend = backend
+        self.mutable_ttl = mutable_ttl
+        self.max_buckets = max_buckets
+        self.now = now
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def get_alert_timeline(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", interval="1h", split_by=None, filters=None):
+        window = _parse_window(start_date, end_date, start_time, end_time)
+        if window is None:
+            return self.backend.get_alert_timeline(responder_name, start_date, end_date, start_time, end_time, interval, split_by, filters)
+        start, end = window
+        size = timeline_interval(interval)
+        if (end - start) / size > TIMELINE_MAX_BUCKETS:
+            raise ValueError(f"window spans more than {TIMELINE_MAX_BUCKETS} {interval} buckets")
+        complete_before = self.now() - timedelta(milliseconds=INDEX_LAG_MS)
+        clock = time.time()
+        ttl = self.mutable_ttl if split_by in self.MUTABLE_SPLITS or filters else None
+
+        bucket_starts = []
+        bucket_start = _floor(start, size)
+        while bucket_start < end:
+            bucket_starts.append(bucket_start)
+            bucket_start += size
+
+        def cacheable(bucket_start):
+            bucket_end = bucket_start + size
+            return bucket_start >= start and bucket_end <= end and bucket_end <= complete_before
+
+        entries = {}
+        with self._lock:
+            for bucket_start in bucket_starts:
+                key = (responder_name, interval, split_by, filters, bucket_start)
+                cached = self._buckets.get(key)
+                if cached is not None and (ttl is None or clock - cached[1] < ttl):
+                    self._buckets.move_to_end(key)
+                    entries[bucket_start] = cached[0]
+
+        missing = [b for b in bucket_starts if b not in entries]
+        # One histogram per contiguous run of uncached buckets: usually the
+        # partial bucket at the window start and the current one at its end
+        for run in _contiguous_runs(missing, size):
+            fetch_start = max(start, run[0])
+            fetch_end = min(end, run[-1] + size)
+            fetched = {
+                EPOCH + timedelta(milliseconds=bucket['key']): bucket
+                for bucket in self.backend.get_alert_timeline(
+                    responder_name, fetch_start.strftime('%Y-%m-%d'), fetch_end.strftime('%Y-%m-%d'),
+                    fetch_start.strftime('%H:%M:%S'), fetch_end.strftime('%H:%M:%S'), interval, split_by, filters)
+            }
+            with self._lock:
+                for bucket_start in run:
+                    bucket = fetched.get(bucket_start) or self._empty_bucket(bucket_start, split_by)
+                    entries[bucket_start] = bucket
+                    if cacheable(bucket_start):
+                        key = (responder_name, interval, split_by, filters, bucket_start)
+                        self._buckets.pop(key, None)
+                        self._buckets[key] = (bucket, clock)
+                while len(self._buckets) > self.max_buckets:
+                    self._buckets.popitem(last=False)
+
+        return [entries[b] for b in bucket_starts]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def _empty_bucket(self, bucket_start, split_by):
+        bucket = {"key": int((bucket_start - EPOCH).total_seconds() * 1000), "count": 0}
+        if split_by:
+            bucket["groups"] = {}
+        return bucket
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time.
+
+    Callers arriving while a call with the same key is in flight wait for
+    it and share its result, or its exception, instead of starting their
+    own. Nothing is kept once the call finishes.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Return ``(fn(), shared)``, where ``shared`` is True if another caller's run was joined."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class CoalescingAlertSource:
+    """Shares one fetch among concurrent identical alert queries.
+
+    Windows are normalized first: the end is rounded up to a multiple of
+    ``granularity``, so dashboards opened a few seconds apart (each with
+    ``end_time`` defaulting to "now") ask for the same window. Concurrent
+    calls for the same responder and normalized window then run a single
+    scroll and transform through ``SingleFlight``.
+
+    Other attributes are delegated to the wrapped source.
+    """
+
+    def __init__(self, source, transformer, granularity=timedelta(seconds=30)):
+        self.source = source
+        self.transformer = transformer
+        self.granularity = granularity
+        self._flights = SingleFlight()
+
+    def __getattr__(self, name):
+        return getattr(self.source, name)
+
+    def normalize_window(self, start_date, end_date, start_time, end_time):
+        """Return the window with its end rounded up to ``granularity``, as ``(start_date, end_date, start_time, end_time)``."""
+        window = _parse_window(start_date, end_date, start_time, end_time)
+        if window is None or not self.granularity:
+            return start_date, end_date, start_time, end_time
+        end = window[1]
+        floor = _floor(end, self.granularity)
+        end = floor if floor == end else floor + self.granularity
+        return window[0].strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'), start_time, end.strftime('%H:%M:%S')
+
+    def get_alerts(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", all_fields=False, filters=None):
+        window = self.normalize_window(start_date, end_date, start_time, end_time)
+        alerts = self._share('get_alerts', (_key(responder_name),) + window + (all_fields, filters),
+                             lambda: self.source.get_alerts(responder_name, *window, all_fields, filters))
+        # Callers own their list; the alerts in it are shared
+        return list(alerts)
+
+    def get_alert_records(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", all_fields=False, filters=None):
+        """Fetch and transform a window into ``(records, fingerprint)``; raw docs with ``all_fields``.
+
+        The window is taken as given, so callers that also compute ETags
+        should normalize it once with ``normalize_window`` up front.
+        The returned list is shared between callers and must not be modified.
+        """
+        window = (start_date, end_date, start_time, end_time)
+        return self._share('get_alert_records', (_key(responder_name),) + window + (all_fields, filters),
+                           lambda: self._fetch_records(responder_name, window, all_fields, filters))
+
+    def _fetch_records(self, responder_name, window, all_fields, filters):
+        timings = current_timings() or RequestTimings('get_alert_records')
+        records = []
+        fingerprint = ResultFingerprint()
+        pages = self.source.iter_alert_pages(responder_name, *window, all_fields, filters=filters)
+        try:
+            while True:
+                with timings.stage('fetch'):
+                    page = next(pages, None)
+                if page is None:
+                    break
+                fingerprint.add_page(page)
+                with timings.stage('transform'):
+                    records.extend(page if all_fields else self.transformer.transform_records(page))
+        finally:
+            pages.close()
+        return records, fingerprint
+
+    def _share(self, operation, key, fn):
+        timings = current_timings()
+        start = time.perf_counter()
+        result, shared = self._flights.do((operation,) + key, fn)
+        if shared:
+            COALESCED_REQUESTS.labels(operation).inc()
+            if timings is not None:
+                timings.add('coalesced_wait', time.perf_counter() - start)
+        return result
+
+
+def _key(responder_name):
+    return tuple(responder_name) if isinstance(responder_name, (list, tuple)) else responder_name
+
+
+class StaleWhileRevalidateCache:
+    """Single-value TTL cache that never makes readers wait on a refresh.
+
+    The first ``get`` loads synchronously (concurrent first callers share the
+    load). After that the cached value is always returned immediately; once
+    it is older than ``ttl`` seconds a background thread reloads it. A failed
+    refresh keeps serving the previous value and is retried after
+    ``retry_after`` seconds.
+    """
+
+    def __init__(self, loader, ttl=300, retry_after=30, name="cache"):
+        self.loader = loader
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self.name = name
+        self._value = None
+        self._loaded = False
+        self._next_refresh = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._loaded:
+                if not self._refreshing and time.time() >= self._next_refresh:
+                    self._refreshing = True
+                    threading.Thread(target=self._refresh, name=f"{self.name}-refresh", daemon=True).start()
+                return self._value
+
+        with self._load_lock:
+            if not self._loaded:
+                self._set(self.loader())
+            return self._value
+
+    def prime(self):
+        """Start loading in the background so the first reader finds a value."""
+        threading.Thread(target=self._prime, name=f"{self.name}-prime", daemon=True).start()
+
+    def _prime(self):
+        try:
+            self.get()
+        except Exception as e:
+            logging.error(f"Error priming {self.name}: {e}")
+
+    def _refresh(self):
+        try:
+            value = self.loader()
+        except Exception as e:
+            logging.error(f"Error refreshing {self.name}: {e}")
+            with self._lock:
+                self._next_refresh = time.time() + self.retry_after
+                self._refreshing = False
+            return
+        self._set(value)
+
+    def _set(self, value):
+        with self._lock:
+            self._value = value
+            self._loaded = True
+            self._next_refresh = time.time() + self.ttl
+            self._refreshing = False
@@ -0,0 +1,205 @@
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from e2 import DIRECT_MAPPINGS, RESPONDER_FIELDS, source_path, alert_attributes
+from transform import _lookup, _leaves, _to_millis, _MISSING, ALERT_URL_TEMPLATE, TAGS_PREFIX, TIMESTAMP_FIELDS, DURATION_FIELDS
+
+
+# Rows buffered per Parquet row group; scroll pages are much smaller than
+# this, and tiny row groups make the file slow to scan.
+PARQUET_ROW_GROUP_SIZE = 65536
+
+EXPORT_FORMATS = {
+    'parquet': ('application/vnd.apache.parquet', 'alerts.parquet'),
+    # Arrow IPC *stream* format, readable with pyarrow.ipc.open_stream
+    'arrow': ('application/vnd.apache.arrow.stream', 'alerts.arrows'),
+}
+
+TIMESTAMP_TYPE = pa.timestamp('ms', tz='UTC')
+BOOLEAN_FIELDS = {'Acknowledged'}
+INTEGER_FIELDS = {'count'}
+NOT_FOUND_FIELDS = {'Cluster', 'Zone'}
+
+
+class ColumnarAlertExporter:
+    """Builds typed Arrow columns from pages of alert ``_source`` docs.
+
+    Uses the same ``(path, readable_key)`` mapping table as
+    ``AlertTransformer``, but instead of formatted strings the columns keep
+    their types: timestamps as UTC epoch-millis timestamps, ``TimeToClose``
+    and ``TimeToAck`` as float minutes, ``Acknowledged`` as a boolean and
+    ``Tags`` as a list. Values are gathered one column at a time and all
+    conversions are done with ``pyarrow.compute`` on whole pages.
+    """
+
+    def __init__(self, direct_fields, responder_fields):
+        self.fields = []
+        schema_fields = []
+        for path, readable_key in list(direct_fields) + list(responder_fields):
+            simple_key = path[0] if len(path) == 1 else None
+            self.fields.append((readable_key, path, simple_key))
+            schema_fields.append(pa.field(readable_key, self._column_type(readable_key)))
+        schema_fields += [
+            pa.field('TimeToAck', pa.float64()),
+            pa.field('Tags', pa.list_(pa.string())),
+            pa.field('AlertURL', pa.string()),
+        ]
+        self.schema = pa.schema(schema_fields)
+
+    def _column_type(self, readable_key):
+        if readable_key in TIMESTAMP_FIELDS:
+            return TIMESTAMP_TYPE
+        if readable_key in DURATION_FIELDS:
+            return pa.float64()
+        if readable_key in BOOLEAN_FIELDS:
+            return pa.bool_()
+        if readable_key in INTEGER_FIELDS:
+            return pa.int64()
+        return pa.string()
+
+    def record_batch(self, alerts):
+        attributes = [alert_attributes(alert) for alert in alerts]
+        columns = {}
+        millis = {}
+        for readable_key, path, simple_key in self.fields:
+            if simple_key is not None:
+                values = [attrs.get(simple_key) for attrs in attributes]
+                values = [None if type(value) is dict or type(value) is list else value for value in values]
+            else:
+                values = [_lookup(attrs, path) for attrs in attributes]
+                values = [None if value is _MISSING else value for value in values]
+
+            if readable_key in TIMESTAMP_FIELDS:
+                millis[readable_key] = _numbers(values)
+                columns[readable_key] = pc.cast(pc.cast(millis[readable_key], pa.int64(), safe=False), TIMESTAMP_TYPE)
+            elif readable_key in DURATION_FIELDS:
+                columns[readable_key] = pc.divide(_numbers(values), 60000.0)
+            elif readable_key in BOOLEAN_FIELDS:
+                columns[readable_key] = _booleans(values)
+            elif readable_key in INTEGER_FIELDS:
+                columns[readable_key] = pc.cast(_numbers(values), pa.int64(), safe=False)
+            else:
+                columns[readable_key] = _strings(values)
+                if readable_key in NOT_FOUND_FIELDS:
+                    columns[readable_key] = pc.fill_null(columns[readable_key], 'Notfound')
+
+        columns['TimeToAck'] = self._time_to_ack(millis.get('CreatedAt'), millis.get('AlertAckTime'), columns.get('Acknowledged'), len(alerts))
+        columns['Tags'] = pa.array([self._tags(attrs) for attrs in attributes], pa.list_(pa.string()))
+        columns['AlertURL'] = self._alert_urls(columns.get('AlertID'), len(alerts))
+        return pa.RecordBatch.from_arrays([columns[field.name] for field in self.schema], schema=self.schema)
+
+    def _time_to_ack(self, created, acked, acknowledged, length):
+        if created is None or acked is None or acknowledged is None:
+            return pa.nulls(length, pa.float64())
+        # Whole seconds, like the TimeToAck of the JSON and CSV outputs
+        seconds = pc.subtract(pc.floor(pc.divide(acked, 1000.0)), pc.floor(pc.divide(created, 1000.0)))
+        return pc.if_else(pc.fill_null(acknowledged, False), pc.divide(seconds, 60.0), pa.scalar(None, pa.float64()))
+
+    def _tags(self, attributes):
+        tags = []
+        for key, value in attributes.items():
+            if key == 'tags':
+                if type(value) is dict or type(value) is list:
+                    tags.extend(_leaves(value))
+            elif key.startswith(TAGS_PREFIX):
+                tags.extend(_leaves(value))
+        return [str(tag) for tag in tags]
+
+    def _alert_urls(self, alert_ids, length):
+        if alert_ids is None:
+            return pa.nulls(length, pa.string())
+        prefix, suffix = ALERT_URL_TEMPLATE.split('{}')
+        alert_ids = pc.if_else(pc.equal(alert_ids, ''), pa.scalar(None, pa.string()), alert_ids)
+        return pc.binary_join_element_wise(prefix, alert_ids, suffix, '')
+
+    def iter_parquet(self, batches, row_group_size=PARQUET_ROW_GROUP_SIZE):
+        """Yield a Parquet file of ``record_batch`` outputs as byte chunks, one per row group written."""
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, self.schema, compression='zstd')
+        pending, rows = [], 0
+        for batch in batches:
+            pending.append(batch)
+            rows += batch.num_rows
+            if rows >= row_group_size:
+                writer.write_table(pa.Table.from_batches(pending, self.schema), row_group_size=row_group_size)
+                pending, rows = [], 0
+                yield sink.drain()
+        if pending:
+            writer.write_table(pa.Table.from_batches(pending, self.schema), row_group_size=row_group_size)
+        writer.close()
+        yield sink.drain()
+
+    def iter_arrow_stream(self, batches):
+        """Yield an Arrow IPC stream of ``record_batch`` outputs as byte chunks, one per batch."""
+        sink = _ChunkSink()
+        writer = pa.ipc.new_stream(sink, self.schema)
+        for batch in batches:
+            writer.write_batch(batch)
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    def iter_export(self, export_format, batches):
+        if export_format == 'parquet':
+            return self.iter_parquet(batches)
+        return self.iter_arrow_stream(batches)
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last ``drain``."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _numbers(values):
+    # Fast path for numeric (or missing) values; numeric strings and junk fall back per value
+    try:
+        return pa.array(values, pa.float64())
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        return pa.array([_to_millis(value) for value in values], pa.float64())
+
+
+def _booleans(values):
+    try:
+        return pa.array(values, pa.bool_())
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        return pa.array([None if value is None else str(value).lower() == 'true' for value in values], pa.bool_())
+
+
+def _strings(values):
+    try:
+        return pa.array(values, pa.string())
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        return pa.array([None if value is None else str(value) for value in values], pa.string())
+
+
+ALERT_EXPORTER = ColumnarAlertExporter(
+    [(source_path(key)[2:], readable_key) for key, readable_key in DIRECT_MAPPINGS.items()],
+    [(source_path(key)[2:], readable_key) for key, readable_key in RESPONDER_FIELDS],
+)
@@ -1,29 +1,346 @@
-from elasticsearch import Elasticsearch
 from elasticsearch.exceptions import ConnectionTimeout, NotFoundError, ElasticsearchException
 from datetime import datetime, timedelta, timezone
 import logging
+import re
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import heapq
+import queue
+import threading
+import time
 import pytz
-
+from transform import AlertTransformer
+from metrics import es_call, record_page
+from es_client import ElasticsearchSettings, CircuitBreaker, create_client
+
+
+DIRECT_MAPPINGS = {
+    'parsedMessage_attributes_cluster': 'Cluster',
+    'parsedMessage_attributes_service': 'Service',
+    'parsedMessage_attributes_priority': 'Priority',
+    'parsedMessage_attributes_alertType': 'AlertType',
+    'parsedMessage_attributes_message': 'AlertName',
+    'parsedMessage_attributes_status': 'Status',
+    'parsedMessage_attributes_createdAt': 'CreatedAt',
+    'parsedMessage_attributes_updatedAt': 'UpdatedAt',
+    'parsedMessage_attributes_severity': 'Severity',
+    'parsedMessage_attributes_acknowledged': 'Acknowledged',
+    'parsedMessage_attributes_alertAckTime': 'AlertAckTime',
+    'parsedMessage_attributes_alertCloseTime': 'AlertCloseTime',
+    'parsedMessage_attributes_acknowledgedBy': 'AckBy',
+    'parsedMessage_attributes_closedBy': 'ClosedBy',
+    'parsedMessage_attributes_tinyId': 'TinyID',
+    'parsedMessage_attributes_responders_0_name': 'Team',
+    'parsedMessage_attributes_alertId': 'AlertID',
+    'parsedMessage_attributes_runbook_url': 'RunbookUrl',
+    'parsedMessage_attributes_zoneId': 'Zone',
+    'parsedMessage_attributes_timeTakenToClose': 'TimeToClose',
+    'parsedMessage_attributes_bu': 'BU',
+    'parsedMessage_attributes_count': 'count'
+}
+
+RESPONDER_FIELDS = [
+    ('parsedMessage_attributes_responders_0_onCalls_0_contacts_0_emailId', 'PrimaryResponderEmail'),
+    ('parsedMessage_attributes_responders_0_onCalls_1_contacts_0_emailId', 'SecondaryResponderEmail'),
+]
+
+ATTRIBUTES_PREFIX = 'parsedMessage_attributes_'
+
+
+def source_path(flat_key):
+    """Turn a flattened attribute key back into its ``_source`` path.
+
+    ``'parsedMessage_attributes_responders_0_name'`` becomes
+    ``('parsedMessage', 'attributes', 'responders', 0, 'name')``; list
+    indices are returned as ints.
+    """
+    path = ['parsedMessage', 'attributes']
+    segments = re.split(r'_(\d+)(?:_|$)', flat_key[len(ATTRIBUTES_PREFIX):])
+    for i, segment in enumerate(segments):
+        if segment:
+            path.append(int(segment) if i % 2 else segment)
+    return tuple(path)
+
+
+def source_include(flat_key):
+    """``_source`` include for a flattened key: the field itself, or the whole
+    array it is read from by position.
+
+    Source filtering drops array elements that filter down to nothing, so
+    projecting a leaf inside an array (``responders.onCalls.contacts.emailId``)
+    would shift the positions ``responders_0_onCalls_1_contacts_0_emailId``
+    refers to whenever an element lacks that leaf.
+    """
+    path = source_path(flat_key)
+    for i, part in enumerate(path):
+        if isinstance(part, int):
+            return '.'.join(path[:i])
+    return '.'.join(path)
+
+
+# _source includes covering every field map_field_names reads, so ES does not
+# ship the rest of each alert document.
+SOURCE_FIELDS = sorted(
+    {source_include(key) for key in list(DIRECT_MAPPINGS) + [key for key, _ in RESPONDER_FIELDS]}
+    | {'parsedMessage.attributes.tags*'}
+)
+
+# Compiled once from the mapping table; produces the same output as
+# map_field_names(flatten_json(alert)) without flattening the document.
+ALERT_TRANSFORMER = AlertTransformer(
+    [(source_path(key)[2:], readable_key) for key, readable_key in DIRECT_MAPPINGS.items()],
+    [(source_path(key)[2:], readable_key) for key, readable_key in RESPONDER_FIELDS],
+)
+
+# Fixed column order for CSV exports: every mapped field followed by the
+# derived/default fields map_field_names may add. These are also the
+# columns of the AlertRecords the transformer produces.
+CSV_COLUMNS = ALERT_TRANSFORMER.columns
+
+ALERT_INDEX = "entity.alert"
+CREATED_AT_TIME_FIELD = "parsedMessage.attributes.createdAtTime"
+CREATED_AT_TIME_FORMAT = "yyyy/MM/dd HH:mm:ss"
+UPDATED_AT_FIELD = "parsedMessage.attributes.updatedAt"
+CREATED_AT_FIELD = "parsedMessage.attributes.createdAt"
+RESPONDER_NAME_FIELD = "parsedMessage.attributes.responders.name.keyword"
+SCROLL_TIMEOUT = '1m'
+SCROLL_PAGE_SIZE = 1000
+SCROLL_SLICES = 4
+# Windows matching fewer hits are scrolled in a single request: below this,
+# the extra scroll contexts and merge cost more than the parallelism saves.
+SLICE_MIN_HITS = 10 * SCROLL_PAGE_SIZE
+SLICE_PREFETCH_PAGES = 2
+# Longest a merge waits for a slice page, and a slice for room in its queue.
+# A slice idle for longer has lost its scroll context (SCROLL_TIMEOUT) anyway.
+SLICE_WAIT_TIMEOUT = 60
+MAX_WORKERS = 16
+
+_SLICE_DONE = object()
+
+RESPONDER_NAMES_PAGE_SIZE = 10000
+
+STATS_GROUP_BY_FIELDS = {
+    'Service': 'parsedMessage.attributes.service.keyword',
+    'Priority': 'parsedMessage.attributes.priority.keyword',
+    'Cluster': 'parsedMessage.attributes.cluster.keyword',
+    'BU': 'parsedMessage.attributes.bu.keyword',
+    'AlertType': 'parsedMessage.attributes.alertType.keyword',
+}
+STATS_GROUP_SIZE = 500
+STATS_PERCENTS = [50, 90, 99]
+
+# Query parameters of /alerts and related endpoints that filter the alerts,
+# pushed down as terms filters on these keyword fields. Values of one
+# parameter are OR'ed, different parameters are AND'ed.
+ALERT_FILTER_FIELDS = {
+    'priority': 'parsedMessage.attributes.priority.keyword',
+    'status': 'parsedMessage.attributes.status.keyword',
+    'service': 'parsedMessage.attributes.service.keyword',
+    'cluster': 'parsedMessage.attributes.cluster.keyword',
+    'tags': 'parsedMessage.attributes.tags.keyword',
+}
+
+# /alerts/timeline: fixed date_histogram intervals such as 5m, 1h or 1d
+TIMELINE_INTERVAL_UNITS = {'m': 'minutes', 'h': 'hours', 'd': 'days'}
+TIMELINE_SPLIT_FIELDS = {
+    'Priority': 'parsedMessage.attributes.priority.keyword',
+    'Status': 'parsedMessage.attributes.status.keyword',
+}
+TIMELINE_SPLIT_SIZE = 50
+TIMELINE_MAX_BUCKETS = 5000
+
+# Sortable columns of /alerts pages, by their readable name
+ALERT_SORT_FIELDS = {
+    'CreatedAt': CREATED_AT_TIME_FIELD,
+    'UpdatedAt': UPDATED_AT_FIELD,
+    'Priority': 'parsedMessage.attributes.priority.keyword',
+    'Status': 'parsedMessage.attributes.status.keyword',
+    'Service': 'parsedMessage.attributes.service.keyword',
+    'Cluster': 'parsedMessage.attributes.cluster.keyword',
+    'AlertAckTime': 'parsedMessage.attributes.alertAckTime',
+    'AlertCloseTime': 'parsedMessage.attributes.alertCloseTime',
+    'TimeToClose': 'parsedMessage.attributes.timeTakenToClose',
+}
+# Appended to every page sort so search_after has a total order
+ALERT_SORT_TIEBREAKER = 'parsedMessage.attributes.alertId.keyword'
+DEFAULT_ALERT_SORT = [('CreatedAt', 'desc')]
+MAX_PAGE_LIMIT = 1000
+
+# Minutes between createdAt and alertAckTime; works whether the fields are
+# mapped as epoch-millis longs or as dates.
+TIME_TO_ACK_SCRIPT = {
+    "lang": "painless",
+    "source": (
+        "long toMillis(def v) { return v instanceof Number ? ((Number) v).longValue() : v.toInstant().toEpochMilli(); } "
+        "return (toMillis(doc['parsedMessage.attributes.alertAckTime'].value) "
+        "- toMillis(doc['parsedMessage.attributes.createdAt'].value)) / 60000.0;"
+    )
+}
+
+
+# Alerts may be indexed a little after their updatedAt, so every incremental
+# reader (bucket cache refreshes, the local store sync, the live feed) looks
+# back this far behind its watermark.
+INDEX_LAG_MS = 5 * 60 * 1000
+
+
+def alert_attributes(alert):
+    """``parsedMessage.attributes`` of an alert ``_source``, or {} when missing or malformed."""
+    parsed_message = alert.get('parsedMessage') if type(alert) is dict else None
+    attributes = parsed_message.get('attributes') if type(parsed_message) is dict else None
+    return attributes if type(attributes) is dict else {}
+
+
+def epoch_millis(value):
+    """An epoch-millis attribute (number or numeric string) as an int, or None."""
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class ResultFingerprint:
+    """Summary of a result set used for ETags: alert count, newest ``updatedAt`` and ``createdAt`` range.
+
+    Any alert added to, removed from or updated in a window changes at least
+    one of these. It can be accumulated over the docs actually served
+    (``add_page``) or fetched from ES (``get_alert_fingerprint``); both give
+    the same ``value``.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.max_updated_at = None
+        self.min_created_at = None
+        self.max_created_at = None
+
+    @classmethod
+    def of(cls, count, max_updated_at, min_created_at, max_created_at):
+        fingerprint = cls()
+        fingerprint.count = count
+        fingerprint.max_updated_at = epoch_millis(max_updated_at)
+        fingerprint.min_created_at = epoch_millis(min_created_at)
+        fingerprint.max_created_at = epoch_millis(max_created_at)
+        return fingerprint
+
+    def add_page(self, alerts):
+        self.count += len(alerts)
+        for alert in alerts:
+            attributes = alert_attributes(alert)
+            updated_at = epoch_millis(attributes.get('updatedAt'))
+            created_at = epoch_millis(attributes.get('createdAt'))
+            if updated_at is not None and (self.max_updated_at is None or updated_at > self.max_updated_at):
+                self.max_updated_at = updated_at
+            if created_at is not None:
+                if self.min_created_at is None or created_at < self.min_created_at:
+                    self.min_created_at = created_at
+                if self.max_created_at is None or created_at > self.max_created_at:
+                    self.max_created_at = created_at
+
+    def value(self):
+        return (self.count, self.max_updated_at, self.min_created_at, self.max_created_at)
+
+
+def _wall_clock_millis(dt):
+    return int((dt - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+
+def alert_filters(params):
+    """Normalize ``{param: value or [values]}`` into a hashable filter set.
+
+    Keys must be in ``ALERT_FILTER_FIELDS``; values may also be
+    comma-separated. The result is a tuple of ``(param, (values, ...))``
+    sorted by param and value, so equal filters compare and hash equal and
+    can be used in cache keys. Params without values are dropped.
+    """
+    filters = []
+    for param, values in params.items():
+        if param not in ALERT_FILTER_FIELDS:
+            raise ValueError(f"unknown filter {param}")
+        if isinstance(values, str):
+            values = [values]
+        values = sorted({value.strip() for raw in values for value in raw.split(',') if value.strip()})
+        if values:
+            filters.append((param, tuple(values)))
+    return tuple(sorted(filters))
+
+
+def alert_filter_clauses(filters):
+    """``bool.filter`` clauses for a filter set made by ``alert_filters``."""
+    return [{"terms": {ALERT_FILTER_FIELDS[param]: list(values)}} for param, values in filters or ()]
+
+
+def timeline_interval(interval):
+    """Length of a fixed timeline interval like ``15m``, ``1h`` or ``1d``, or None if it is not one."""
+    match = re.fullmatch(r'([1-9][0-9]*)([mhd])', interval or '')
+    if not match:
+        return None
+    return timedelta(**{TIMELINE_INTERVAL_UNITS[match.group(2)]: int(match.group(1))})
 
 
 class ElasticsearchBackend(ABC):
-    def __init__(self, hosts):
-        self.es = self.connect_to_elasticsearch(hosts)
-    
+    def __init__(self, hosts=None, page_size=SCROLL_PAGE_SIZE, slices=SCROLL_SLICES, max_workers=MAX_WORKERS, settings=None, breaker=None):
+        # Settings and the breaker can be shared so every backend in the
+        # process trips together when the cluster goes away.
+        self.settings = settings or ElasticsearchSettings.from_env()
+        self.hosts = hosts or self.settings.hosts
+        self.breaker = breaker or CircuitBreaker(self.settings.breaker_failures, self.settings.breaker_reset_timeout)
+        self._es = None
+        self._es_lock = threading.Lock()
+        # Scroll contexts held by in-flight requests, cleared by ``close``
+        self._open_scrolls = set()
+        self._scrolls_lock = threading.Lock()
+        self.page_size = page_size
+        self.slices = slices
+        # Shared, bounded pool for slice fetches across all requests
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="es-slice")
+
+    @property
+    def es(self):
+        """The ES client, created on first use so startup never waits on the cluster."""
+        if self._es is None:
+            with self._es_lock:
+                if self._es is None:
+                    self._es = self.connect_to_elasticsearch(self.hosts)
+        return self._es
+
+    @es.setter
+    def es(self, client):
+        self._es = client
+
     def connect_to_elasticsearch(self, hosts):
-        try:
-            es = Elasticsearch(hosts, timeout=1300)
-            if es.ping():
-                logging.info("Connected to Elasticsearch.")
-                return es
-            else:
-                logging.error("Elasticsearch connection failed.")
-                return None
-        except Exception as e:
-            logging.error(f"Error connecting to Elasticsearch: {e}")
-            return None
-    
+        logging.info(f"Creating Elasticsearch client for {hosts}")
+        return create_client(hosts, self.settings, self.breaker)
+
+    def _track_scroll(self, old_scroll_id, new_scroll_id):
+        with self._scrolls_lock:
+            self._open_scrolls.discard(old_scroll_id)
+            if new_scroll_id:
+                self._open_scrolls.add(new_scroll_id)
+
+    def _take_open_scrolls(self):
+        with self._scrolls_lock:
+            scroll_ids = list(self._open_scrolls)
+            self._open_scrolls.clear()
+        return scroll_ids
+
+    def close(self):
+        """Clear scroll contexts still held by unfinished requests and stop the slice workers.
+
+        Called on worker shutdown so abandoned streams do not pin ES search
+        contexts until their keep-alive runs out.
+        """
+        scroll_ids = self._take_open_scrolls()
+        if scroll_ids:
+            try:
+                with es_call('clear_scroll'):
+                    self.es.clear_scroll(scroll_id=scroll_ids)
+                logging.info(f"Cleared {len(scroll_ids)} open scroll contexts")
+            except Exception as e:
+                logging.error(f"Error clearing scroll contexts on shutdown: {e}")
+        self.executor.shutdown(wait=False)
+
     @abstractmethod
     def get_alerts(self, responder_name, start_date=None, end_date=None):
         pass
@@ -32,23 +349,48 @@ class ElasticsearchBackend(ABC):
     def get_unique_responder_names(self):
         pass
 
-    def get_unique_responder_names(self):
-        query = {
+    def build_responder_names_query(self, after_key=None):
+        composite = {
+            "size": RESPONDER_NAMES_PAGE_SIZE,
+            "sources": [{"responder_name": {"terms": {"field": RESPONDER_NAME_FIELD}}}]
+        }
+        if after_key:
+            composite["after"] = after_key
+        return {
             "size": 0,
             "aggs": {
                 "unique_responder_names": {
-                    "composite": {
-                        "size": 10000,
-                        "sources": [{"responder_name": {"terms": {"field": "parsedMessage.attributes.responders.name.keyword"}}}]
-                    }
+                    "composite": composite
                 }
             }
         }
+
+    def parse_responder_names_page(self, response):
+        """Return the responder names of one composite page and the ``after_key`` of the next (None when done)."""
+        aggregation = response.get('aggregations', {}).get('unique_responder_names', {})
+        buckets = aggregation.get('buckets', [])
+        names = [bucket['key']['responder_name'] for bucket in buckets if '@' not in bucket['key']['responder_name']]
+        return names, aggregation.get('after_key') if buckets else None
+
+    def fetch_unique_responder_names(self):
+        """Page through the responder-name composite aggregation via ``after_key``.
+
+        Unlike ``get_unique_responder_names`` this lets ES errors propagate,
+        so callers can tell a failure apart from an empty result.
+        """
+        unique_names = []
+        after_key = None
+        while True:
+            with es_call('search'):
+                response = self.es.search(index=ALERT_INDEX, body=self.build_responder_names_query(after_key))
+            names, after_key = self.parse_responder_names_page(response)
+            unique_names.extend(names)
+            if not after_key:
+                return unique_names
+
+    def get_unique_responder_names(self):
         try:
-            response = self.es.search(index="entity.alert", body=query)
-            buckets = response.get('aggregations', {}).get('unique_responder_names', {}).get('buckets', [])
-            unique_names = [bucket['key']['responder_name'] for bucket in buckets if '@' not in bucket['key']['responder_name']]
-            return unique_names
+            return self.fetch_unique_responder_names()
         except ConnectionTimeout:
             logging.error("Connection timeout when fetching unique responder names.")
         except NotFoundError:
@@ -75,7 +417,7 @@ class ElasticsearchBackend(ABC):
 
 
     
-    def get_alerts(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59"):
+    def build_alert_query(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", updated_since=None, filters=None):
         # Check if start_date or end_date is None, default to current date
         if not start_date:
             start_date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
@@ -86,16 +428,20 @@ class ElasticsearchBackend(ABC):
         formatted_start_datetime = self.format_for_es(start_date, start_time)
         formatted_end_datetime = self.format_for_es(end_date, end_time)
 
-        
-       
+        # A list of responders becomes a single terms clause
+        if isinstance(responder_name, (list, tuple)):
+            responder_clause = {"terms": {RESPONDER_NAME_FIELD: list(responder_name)}}
+        else:
+            responder_clause = {"term": {RESPONDER_NAME_FIELD: responder_name}}
 
+        # Everything is in filter context: no scoring, and ES can cache the clauses
         query = {
             "query": {
                 "bool": {
-                    "must": [
-                        {"term": {"parsedMessage.attributes.responders.name.keyword": responder_name}},
+                    "filter": [
+                        responder_clause,
                         {"range": {
-                            "parsedMessage.attributes.createdAtTime": {
+                            CREATED_AT_TIME_FIELD: {
                                 "gte": formatted_start_datetime,
                                 "lt": formatted_end_datetime
                             }
@@ -104,39 +450,397 @@ class ElasticsearchBackend(ABC):
                 }
             }
         }
-        #     "query": {
-        #         "bool": {
-        #             "must": [
-        #                 {"match": {"parsedMessage.attributes.responders.name": responder_name}},
-        #                 {"range": {
-        #                     "parsedMessage.attributes.createdAtTime": {
-        #                         "gte": formatted_start_datetime,
-        #                         "lt": formatted_end_datetime
-        #                     }
-        #                 }}
-        #             ]
-        #         }
-        #     }
-        # }
+        if updated_since is not None:
+            # Incremental refresh: only alerts touched since the given epoch millis
+            query["query"]["bool"]["filter"].append({"range": {UPDATED_AT_FIELD: {"gte": updated_since}}})
+        query["query"]["bool"]["filter"].extend(alert_filter_clauses(filters))
+        return query
+
+    def iter_alert_hit_pages(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", all_fields=False, updated_since=None, filters=None):
+        """Yield each non-empty page of raw hits in ``createdAtTime`` order.
+
+        Hits keep their ``sort`` value (``createdAtTime`` in epoch millis).
+        With ``slices > 1`` a window matching at least ``SLICE_MIN_HITS``
+        is fetched as a sliced scroll whose slices run concurrently on the
+        backend's thread pool and are merged back into a single ordered
+        stream; smaller windows use one plain scroll. Every scroll context
+        is cleared when the generator is exhausted, fails or is closed early.
+        """
+        query = self.build_alert_query(responder_name, start_date, end_date, start_time, end_time, updated_since, filters)
+        query["sort"] = [{CREATED_AT_TIME_FIELD: "asc"}]
+        if not all_fields:
+            query["_source"] = SOURCE_FIELDS
         logging.info(f"query:{query}")
-        
-        all_alerts = []
+
+        if self.slices > 1:
+            hit_pages = self._iter_sliced_or_scroll_hit_pages(query)
+        else:
+            hit_pages = self._iter_scroll_hit_pages(query)
+        try:
+            yield from hit_pages
+        finally:
+            hit_pages.close()
+
+    def _iter_sliced_or_scroll_hit_pages(self, query):
+        # The first page of a plain scroll tells how big the window is (scroll
+        # searches always count hits exactly); small windows carry on with
+        # it, large ones drop it and switch to slices.
+        page = self._start_scroll(query)
+        total = page['hits']['total']
+        if isinstance(total, dict):
+            total = total['value']
+        if total < SLICE_MIN_HITS:
+            hit_pages = self._iter_scroll_hit_pages(query, page)
+        else:
+            self._clear_scroll(page.get('_scroll_id'))
+            hit_pages = self._iter_sliced_hit_pages(query)
+        try:
+            yield from hit_pages
+        finally:
+            hit_pages.close()
+
+    def iter_alert_pages(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", all_fields=False, updated_since=None, filters=None):
+        """Yield the ``_source`` docs of each non-empty page in ``createdAtTime`` order."""
+        hit_pages = self.iter_alert_hit_pages(responder_name, start_date, end_date, start_time, end_time, all_fields, updated_since, filters)
+        try:
+            for hits in hit_pages:
+                yield [hit["_source"] for hit in hits]
+        finally:
+            hit_pages.close()
+
+    def search_alerts_page(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", sort=None, limit=50, search_after=None, filters=None):
+        """Fetch one page of alerts ordered by ``sort``, continuing after ``search_after``.
+
+        ``sort`` is a list of ``(name, order)`` pairs keyed by
+        ``ALERT_SORT_FIELDS``. Returns ``(alerts, total, next_search_after)``;
+        ``next_search_after`` is None on the last page.
+        """
+        sort = sort or DEFAULT_ALERT_SORT
+        query = self.build_alert_query(responder_name, start_date, end_date, start_time, end_time, filters=filters)
+        query["sort"] = [{ALERT_SORT_FIELDS[name]: {"order": order, "missing": "_last"}} for name, order in sort]
+        query["sort"].append({ALERT_SORT_TIEBREAKER: "asc"})
+        # One extra hit tells whether another page exists
+        query["size"] = limit + 1
+        query["track_total_hits"] = True
+        query["_source"] = SOURCE_FIELDS
+        if search_after:
+            query["search_after"] = search_after
+        logging.info(f"page query:{query}")
+
+        with es_call('search'):
+            response = self.es.search(index=ALERT_INDEX, body=query)
+        hits = response['hits']['hits']
+        record_page(len(hits))
+        total = response['hits']['total']
+        if isinstance(total, dict):
+            total = total['value']
+
+        next_search_after = hits[limit - 1]['sort'] if len(hits) > limit else None
+        return [hit["_source"] for hit in hits[:limit]], total, next_search_after
+
+    def iter_updated_alert_hit_pages(self, updated_since, responder_name=None, filters=None):
+        """Yield pages of hits for every alert with ``updatedAt >= updated_since`` (epoch millis).
+
+        Used by incremental consumers (the local store sync). Each hit also
+        carries ``createdAtTime`` formatted as ``CREATED_AT_TIME_FORMAT``
+        under ``fields`` so it can be compared with ``format_for_es`` output.
+        """
+        clauses = [{"range": {UPDATED_AT_FIELD: {"gte": updated_since}}}]
+        if responder_name is not None:
+            clauses.append({"term": {RESPONDER_NAME_FIELD: responder_name}})
+        clauses.extend(alert_filter_clauses(filters))
+        body = {
+            "query": {"bool": {"filter": clauses}},
+            "_source": SOURCE_FIELDS,
+            "docvalue_fields": [{"field": CREATED_AT_TIME_FIELD, "format": CREATED_AT_TIME_FORMAT}]
+        }
+        return self._iter_scroll_hit_pages(body)
+
+    def _start_scroll(self, body):
+        with es_call('search'):
+            page = self.es.search(index=ALERT_INDEX, body=body, scroll=SCROLL_TIMEOUT, size=self.page_size)
+        self._track_scroll(None, page.get('_scroll_id'))
+        return page
+
+    def _clear_scroll(self, scroll_id):
+        if not scroll_id:
+            return
+        self._track_scroll(scroll_id, None)
         try:
-            page = self.es.search(index="entity.alert", body=query, scroll='1m', size=100)
-            scroll_id = page['_scroll_id']
-            alerts = [hit["_source"] for hit in page['hits']['hits']]
-            while len(page['hits']['hits']):
-                page = self.es.scroll(scroll_id=scroll_id, scroll='1m')
-                scroll_id = page['_scroll_id']
-                alerts.extend([hit["_source"] for hit in page['hits']['hits']])
-            all_alerts.extend(alerts)
+            with es_call('clear_scroll'):
+                self.es.clear_scroll(scroll_id=scroll_id)
         except Exception as e:
-            logging.error(f"Error fetching alerts: {e}")
+            logging.error(f"Error clearing scroll context: {e}")
 
-        if 'scroll_id' in locals():
-            self.es.clear_scroll(scroll_id=scroll_id)
+    def _iter_scroll_hit_pages(self, body, page=None):
+        """Yield the hit pages of a scroll over ``body``, continuing from its first response ``page`` if given."""
+        scroll_id = page.get('_scroll_id') if page is not None else None
+        try:
+            if page is None:
+                page = self._start_scroll(body)
+                scroll_id = page.get('_scroll_id')
+            while page['hits']['hits']:
+                record_page(len(page['hits']['hits']))
+                yield page['hits']['hits']
+                with es_call('scroll'):
+                    page = self.es.scroll(scroll_id=scroll_id, scroll=SCROLL_TIMEOUT)
+                previous_scroll_id, scroll_id = scroll_id, page.get('_scroll_id', scroll_id)
+                if scroll_id != previous_scroll_id:
+                    self._track_scroll(previous_scroll_id, scroll_id)
+        finally:
+            self._clear_scroll(scroll_id)
+
+    def _iter_sliced_hit_pages(self, query):
+        stop = threading.Event()
+        slice_queues = [queue.Queue(maxsize=SLICE_PREFETCH_PAGES) for _ in range(self.slices)]
+        for slice_id, slice_queue in enumerate(slice_queues):
+            body = dict(query, slice={"id": slice_id, "max": self.slices})
+            # Run in a copy of the caller's context so slice ES calls count towards its request timings
+            self.executor.submit(contextvars.copy_context().run, self._fetch_slice, body, slice_queue, stop)
+
+        try:
+            # Each slice is already sorted, so a k-way merge restores global order
+            merged = heapq.merge(*[self._drain_slice(q) for q in slice_queues], key=lambda hit: hit['sort'])
+            hits = []
+            for hit in merged:
+                hits.append(hit)
+                if len(hits) >= self.page_size:
+                    yield hits
+                    hits = []
+            if hits:
+                yield hits
+        finally:
+            stop.set()
+
+    def _fetch_slice(self, body, slice_queue, stop):
+        # A merge that gave up before this slice got a worker needs nothing from it
+        if stop.is_set():
+            return
+
+        def put(item):
+            # Bounded, so a stalled consumer cannot hold a shared worker forever
+            deadline = time.monotonic() + SLICE_WAIT_TIMEOUT
+            while not stop.is_set() and time.monotonic() < deadline:
+                try:
+                    slice_queue.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        hit_pages = self._iter_scroll_hit_pages(body)
+        try:
+            for hits in hit_pages:
+                if not put(hits):
+                    if not stop.is_set():
+                        logging.warning(f"Abandoning alert slice {body['slice']['id']}: consumer stalled for {SLICE_WAIT_TIMEOUT}s")
+                    return
+        except Exception as e:
+            logging.error(f"Error fetching alert slice {body['slice']['id']}: {e}")
+            put(e)
+            return
+        finally:
+            hit_pages.close()
+        put(_SLICE_DONE)
+
+    def _drain_slice(self, slice_queue):
+        while True:
+            try:
+                # Fails the request when every slice worker is busy with other
+                # requests, or a slice was abandoned, instead of hanging
+                item = slice_queue.get(timeout=SLICE_WAIT_TIMEOUT)
+            except queue.Empty:
+                raise TimeoutError(f"No page from alert slice within {SLICE_WAIT_TIMEOUT}s")
+            if item is _SLICE_DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield from item
+
+    def iter_alerts(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", all_fields=False, filters=None):
+        """Yield matching ``_source`` docs one at a time, fetching a scroll page only when the previous one is used up."""
+        pages = self.iter_alert_pages(responder_name, start_date, end_date, start_time, end_time, all_fields, filters=filters)
+        try:
+            for page in pages:
+                yield from page
+        finally:
+            pages.close()
+
+    def get_alerts(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", all_fields=False, filters=None):
+        try:
+            all_alerts = list(self.iter_alerts(responder_name, start_date, end_date, start_time, end_time, all_fields, filters))
+        except Exception as e:
+            logging.error(f"Error fetching alerts: {e}")
+            return []
 
         return all_alerts
+
+    def get_alerts_by_responder(self, responder_names, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", limit=None, filters=None):
+        """Fetch alerts for several responders at once, grouped by responder name.
+
+        Without ``limit`` a single ``terms`` query is scrolled and each alert
+        is assigned to every requested responder it lists. With ``limit`` one
+        ``msearch`` returns the most recent ``limit`` alerts per responder.
+        """
+        grouped = {name: [] for name in responder_names}
+        if limit is not None:
+            searches = []
+            for name in responder_names:
+                query = self.build_alert_query(name, start_date, end_date, start_time, end_time, filters=filters)
+                query["size"] = limit
+                query["sort"] = [{CREATED_AT_TIME_FIELD: "desc"}]
+                query["_source"] = SOURCE_FIELDS
+                searches.extend([{"index": ALERT_INDEX}, query])
+            logging.info(f"msearch for {len(responder_names)} responders")
+            with es_call('msearch'):
+                response = self.es.msearch(body=searches)
+            for name, result in zip(responder_names, response['responses']):
+                if 'error' in result:
+                    raise ElasticsearchException(f"msearch failed for responder {name}: {result['error']}")
+                record_page(len(result['hits']['hits']))
+                grouped[name] = [hit["_source"] for hit in result['hits']['hits']]
+            return grouped
+
+        for alert in self.iter_alerts(list(responder_names), start_date, end_date, start_time, end_time, filters=filters):
+            responders = ((alert.get('parsedMessage') or {}).get('attributes') or {}).get('responders') or []
+            if isinstance(responders, dict):
+                responders = [responders]
+            for responder in responders:
+                alerts = grouped.get(responder.get('name')) if isinstance(responder, dict) else None
+                if alerts is not None and (not alerts or alerts[-1] is not alert):
+                    alerts.append(alert)
+        return grouped
+
+    def get_alert_fingerprint(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", filters=None):
+        """Fingerprint a window's result set with one size-0 query; see ``ResultFingerprint``."""
+        query = self.build_alert_query(responder_name, start_date, end_date, start_time, end_time, filters=filters)
+        query["size"] = 0
+        query["track_total_hits"] = True
+        query["aggs"] = {
+            "max_updated_at": {"max": {"field": UPDATED_AT_FIELD}},
+            "min_created_at": {"min": {"field": CREATED_AT_FIELD}},
+            "max_created_at": {"max": {"field": CREATED_AT_FIELD}}
+        }
+        with es_call('search'):
+            response = self.es.search(index=ALERT_INDEX, body=query)
+        total = response['hits']['total']
+        if isinstance(total, dict):
+            total = total['value']
+        aggregations = response.get('aggregations', {})
+        return ResultFingerprint.of(total, *(aggregations.get(name, {}).get('value')
+                                            for name in ('max_updated_at', 'min_created_at', 'max_created_at')))
+
+    def get_alert_stats(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", group_by=None, filters=None):
+        """Compute alert counts and time-to-ack/time-to-close summaries (in minutes) with ES aggregations.
+
+        ``group_by`` is one of the keys of ``STATS_GROUP_BY_FIELDS``; the
+        overall summary is always returned alongside the per-group ones.
+        """
+        query = self.build_alert_query(responder_name, start_date, end_date, start_time, end_time, filters=filters)
+        query["size"] = 0
+        query["track_total_hits"] = True
+        query["aggs"] = self._stats_aggs()
+        if group_by:
+            query["aggs"]["groups"] = {
+                "terms": {"field": STATS_GROUP_BY_FIELDS[group_by], "size": STATS_GROUP_SIZE},
+                "aggs": self._stats_aggs()
+            }
+        logging.info(f"stats query:{query}")
+
+        with es_call('search'):
+            response = self.es.search(index=ALERT_INDEX, body=query)
+        aggregations = response.get('aggregations', {})
+        stats = {
+            "overall": self._summarize_stats_bucket(response['hits']['total'], aggregations),
+            "groups": []
+        }
+        for bucket in aggregations.get('groups', {}).get('buckets', []):
+            group = self._summarize_stats_bucket(bucket['doc_count'], bucket)
+            group["key"] = bucket['key']
+            stats["groups"].append(group)
+        return stats
+
+    def get_alert_timeline(self, responder_name, start_date=None, end_date=None, start_time="00:00:00", end_time="23:59:59", interval="1h", split_by=None, filters=None):
+        """Count alerts per ``interval`` of ``createdAtTime`` with one ``date_histogram``.
+
+        ``createdAtTime`` holds IST wall-clock times, which ES reads as UTC,
+        so bucketing without a ``time_zone`` gives IST-aligned buckets (a
+        ``1d`` bucket starts at IST midnight). Returns ``[{"key", "count"}]``
+        in time order, empty buckets included, where ``key`` is the bucket
+        start in the same wall-clock epoch millis; with ``split_by`` (a key
+        of ``TIMELINE_SPLIT_FIELDS``) each bucket also has ``groups``, a
+        count per value. Raises ValueError for windows needing more than
+        ``TIMELINE_MAX_BUCKETS`` buckets.
+        """
+        size = timeline_interval(interval)
+        start = datetime.strptime(f"{start_date} {start_time}", "%Y-%m-%d %H:%M:%S")
+        end = datetime.strptime(f"{end_date} {end_time}", "%Y-%m-%d %H:%M:%S")
+        if (end - start) / size > TIMELINE_MAX_BUCKETS:
+            raise ValueError(f"window spans more than {TIMELINE_MAX_BUCKETS} {interval} buckets")
+
+        query = self.build_alert_query(responder_name, start_date, end_date, start_time, end_time, filters=filters)
+        query["size"] = 0
+        histogram = {
+            "date_histogram": {
+                "field": CREATED_AT_TIME_FIELD,
+                "fixed_interval": interval,
+                "min_doc_count": 0,
+                "extended_bounds": {"min": _wall_clock_millis(start), "max": _wall_clock_millis(end) - 1}
+            }
+        }
+        if split_by:
+            histogram["aggs"] = {"groups": {"terms": {"field": TIMELINE_SPLIT_FIELDS[split_by], "size": TIMELINE_SPLIT_SIZE}}}
+        query["aggs"] = {"timeline": histogram}
+        logging.info(f"timeline query:{query}")
+
+        with es_call('search'):
+            response = self.es.search(index=ALERT_INDEX, body=query)
+        buckets = []
+        for bucket in response.get('aggregations', {}).get('timeline', {}).get('buckets', []):
+            entry = {"key": int(bucket['key']), "count": bucket['doc_count']}
+            if split_by:
+                entry["groups"] = {group['key']: group['doc_count'] for group in bucket.get('groups', {}).get('buckets', [])}
+            buckets.append(entry)
+        return buckets
+
+    def _stats_aggs(self):
+        return {
+            "acknowledged": {
+                "filter": {"bool": {"filter": [
+                    {"term": {"parsedMessage.attributes.acknowledged": True}},
+                    {"exists": {"field": "parsedMessage.attributes.createdAt"}},
+                    {"exists": {"field": "parsedMessage.attributes.alertAckTime"}}
+                ]}},
+                "aggs": {
+                    "time_to_ack_avg": {"avg": {"script": TIME_TO_ACK_SCRIPT}},
+                    "time_to_ack_percentiles": {"percentiles": {"script": TIME_TO_ACK_SCRIPT, "percents": STATS_PERCENTS}}
+                }
+            },
+            "time_to_close_avg": {"avg": {"field": "parsedMessage.attributes.timeTakenToClose"}},
+            "time_to_close_percentiles": {"percentiles": {"field": "parsedMessage.attributes.timeTakenToClose", "percents": STATS_PERCENTS}}
+        }
+
+    def _summarize_stats_bucket(self, count, bucket):
+        if isinstance(count, dict):  # hits.total is an object on ES 7
+            count = count.get('value', 0)
+        acknowledged = bucket.get('acknowledged', {})
+        time_to_close = self._summarize_durations(bucket.get('time_to_close_avg'), bucket.get('time_to_close_percentiles'))
+        # timeTakenToClose is stored in milliseconds; the ack script already returns minutes
+        time_to_close = {key: self.convert_milliseconds_to_minutes(value) if value is not None else None
+                         for key, value in time_to_close.items()}
+        return {
+            "count": count,
+            "acknowledged_count": acknowledged.get('doc_count', 0),
+            "time_to_ack": self._summarize_durations(acknowledged.get('time_to_ack_avg'), acknowledged.get('time_to_ack_percentiles')),
+            "time_to_close": time_to_close
+        }
+
+    def _summarize_durations(self, avg_agg, percentiles_agg):
+        summary = {"avg": (avg_agg or {}).get('value')}
+        values = (percentiles_agg or {}).get('values', {})
+        for percent in STATS_PERCENTS:
+            summary[f"p{percent}"] = values.get(f"{float(percent)}")
+        return summary
     
     # def format_date(self, date_str):
     #     # Convert ISO 8601 format to the expected Elasticsearch date format
@@ -197,6 +901,16 @@ class ElasticsearchBackend(ABC):
     
     
     
+    def transform_alert(self, alert):
+        return ALERT_TRANSFORMER.transform(alert)
+
+    def transform_alerts(self, alerts):
+        return ALERT_TRANSFORMER.transform_page(alerts)
+
+    def transform_records(self, alerts):
+        """Map a page of alerts to ``AlertRecord``s, which serialize without building per-alert dicts."""
+        return ALERT_TRANSFORMER.transform_records(alerts)
+
     def flatten_json(self, y):
         out = {}
         def flatten(x, name=''):
@@ -241,35 +955,8 @@ class ElasticsearchBackend(ABC):
 
     def map_field_names(self, flattened_alert):
         readable_alert = {}
-        direct_mappings = {
-            'parsedMessage_attributes_cluster': 'Cluster',
-            'parsedMessage_attributes_service': 'Service',
-            'parsedMessage_attributes_priority': 'Priority',
-            'parsedMessage_attributes_alertType': 'AlertType',
-            'parsedMessage_attributes_message': 'AlertName',
-            'parsedMessage_attributes_status': 'Status',
-            'parsedMessage_attributes_createdAt': 'CreatedAt',
-            'parsedMessage_attributes_updatedAt': 'UpdatedAt',
-            'parsedMessage_attributes_severity': 'Severity',
-            'parsedMessage_attributes_acknowledged': 'Acknowledged',
-            'parsedMessage_attributes_alertAckTime': 'AlertAckTime',
-            'parsedMessage_attributes_alertCloseTime': 'AlertCloseTime',
-            'parsedMessage_attributes_acknowledgedBy': 'AckBy',
-            'parsedMessage_attributes_closedBy': 'ClosedBy',
-            'parsedMessage_attributes_tinyId': 'TinyID',
-            'parsedMessage_attributes_responders_0_name': 'Team', 
-            'parsedMessage_attributes_alertId': 'AlertID',
-            'parsedMessage_attributes_runbook_url': 'RunbookUrl',
-            'parsedMessage_attributes_zoneId': 'Zone',
-            'parsedMessage_attributes_timeTakenToClose': 'TimeToClose',
-            'parsedMessage_attributes_bu': 'BU',
-            'parsedMessage_attributes_count':'count'
-  
-        }
-
-     
         for key, value in flattened_alert.items():
-            new_key = direct_mappings.get(key)
+            new_key = DIRECT_MAPPINGS.get(key)
             if new_key:
                 if new_key in ['CreatedAt', 'UpdatedAt', 'AlertCloseTime', 'AlertAckTime'] and self.is_milliseconds(value):
                     readable_alert[new_key] = self.convert_milliseconds_to_datetime(float(value))
@@ -279,12 +966,7 @@ class ElasticsearchBackend(ABC):
                     readable_alert[new_key] = value
 
     
-        responder_fields = [
-            ('parsedMessage_attributes_responders_0_onCalls_0_contacts_0_emailId', 'PrimaryResponderEmail'),
-            ('parsedMessage_attributes_responders_0_onCalls_1_contacts_0_emailId', 'SecondaryResponderEmail'),
-        ]
-
-        for field_key, readable_key in responder_fields:
+        for field_key, readable_key in RESPONDER_FIELDS:
             if field_key in flattened_alert:
                 readable_alert[readable_key] = flattened_alert[field_key]
 
@@ -0,0 +1,220 @@
+from elasticsearch import Elasticsearch, AsyncElasticsearch
+from elasticsearch.exceptions import ConnectionError, ConnectionTimeout, TransportError, ElasticsearchException
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+
+from metrics import ES_RETRIES, ES_CIRCUIT_OPEN
+
+
+DEFAULT_ES_HOSTS = "http://apm-logging-es.internal.olympus-world.zetaapps.in:9200"
+DEFAULT_REQUEST_TIMEOUT = 60
+# Interactive async requests should fail fast rather than tie up a worker
+DEFAULT_ASYNC_REQUEST_TIMEOUT = 30
+# One connection per thread that can be talking to ES at once: the 16 slice
+# workers (e2.MAX_WORKERS) plus up to 16 request threads per process
+DEFAULT_POOL_SIZE = 32
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_BACKOFF = 0.2
+DEFAULT_RETRY_BACKOFF_MAX = 5.0
+DEFAULT_BREAKER_FAILURES = 5
+DEFAULT_BREAKER_RESET_TIMEOUT = 30
+
+# Safe to resend after a timeout. scroll is not: the first attempt may
+# already have advanced the cursor, so a retry could silently skip a page.
+RETRYABLE_OPERATIONS = {'search', 'msearch', 'count', 'clear_scroll', 'ping', 'info'}
+# Statuses that mean the cluster (or the proxy in front of it) is unavailable
+UNAVAILABLE_STATUSES = {502, 503, 504}
+
+
+class CircuitOpenError(ElasticsearchException):
+    """Raised without contacting ES while the circuit breaker is open."""
+
+
+class ElasticsearchSettings:
+    """Connection settings, read from the environment by ``from_env``.
+
+    ``ES_HOSTS`` is a comma-separated list of URLs. Timeouts are in seconds.
+    """
+
+    def __init__(self, hosts, request_timeout=DEFAULT_REQUEST_TIMEOUT, async_request_timeout=DEFAULT_ASYNC_REQUEST_TIMEOUT, pool_size=DEFAULT_POOL_SIZE,
+                 max_retries=DEFAULT_MAX_RETRIES, retry_backoff=DEFAULT_RETRY_BACKOFF, retry_backoff_max=DEFAULT_RETRY_BACKOFF_MAX,
+                 breaker_failures=DEFAULT_BREAKER_FAILURES, breaker_reset_timeout=DEFAULT_BREAKER_RESET_TIMEOUT):
+        self.hosts = hosts
+        self.request_timeout = request_timeout
+        self.async_request_timeout = async_request_timeout
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.breaker_failures = breaker_failures
+        self.breaker_reset_timeout = breaker_reset_timeout
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        return cls(
+            hosts=[host.strip() for host in environ.get('ES_HOSTS', DEFAULT_ES_HOSTS).split(',') if host.strip()],
+            request_timeout=float(environ.get('ES_REQUEST_TIMEOUT', DEFAULT_REQUEST_TIMEOUT)),
+            async_request_timeout=float(environ.get('ES_ASYNC_REQUEST_TIMEOUT', DEFAULT_ASYNC_REQUEST_TIMEOUT)),
+            pool_size=int(environ.get('ES_POOL_SIZE', DEFAULT_POOL_SIZE)),
+            max_retries=int(environ.get('ES_MAX_RETRIES', DEFAULT_MAX_RETRIES)),
+            retry_backoff=float(environ.get('ES_RETRY_BACKOFF', DEFAULT_RETRY_BACKOFF)),
+            retry_backoff_max=float(environ.get('ES_RETRY_BACKOFF_MAX', DEFAULT_RETRY_BACKOFF_MAX)),
+            breaker_failures=int(environ.get('ES_BREAKER_FAILURES', DEFAULT_BREAKER_FAILURES)),
+            breaker_reset_timeout=float(environ.get('ES_BREAKER_RESET_TIMEOUT', DEFAULT_BREAKER_RESET_TIMEOUT)),
+        )
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff before retry number ``attempt`` (0-based)."""
+        return random.uniform(0, min(self.retry_backoff_max, self.retry_backoff * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Fails fast after ``failure_threshold`` consecutive connection failures.
+
+    Once open, calls raise ``CircuitOpenError`` until ``reset_timeout``
+    seconds have passed; then a single trial call is let through
+    (half-open). Its success closes the circuit, its failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_BREAKER_FAILURES, reset_timeout=DEFAULT_BREAKER_RESET_TIMEOUT, name="elasticsearch"):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                raise CircuitOpenError(f"circuit breaker for {self.name} is open")
+            self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logging.info(f"Circuit breaker for {self.name} closed")
+                ES_CIRCUIT_OPEN.set(0)
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logging.error(f"Circuit breaker for {self.name} opened after {self._failures} failures")
+                    ES_CIRCUIT_OPEN.set(1)
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """End a call that neither proved nor disproved ES health (e.g. a 404)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+def _is_unavailable(error):
+    return isinstance(error, ConnectionError) or (
+        isinstance(error, TransportError) and error.status_code in UNAVAILABLE_STATUSES)
+
+
+class ResilientElasticsearch:
+    """Proxy over an ``Elasticsearch`` client adding retries and a circuit breaker.
+
+    Every API method goes through the breaker. ``ConnectionTimeout`` on an
+    operation in ``RETRYABLE_OPERATIONS`` is retried up to
+    ``settings.max_retries`` times with jittered exponential backoff.
+    Other attributes are passed through to the wrapped client.
+    """
+
+    def __init__(self, client, settings, breaker):
+        self.client = client
+        self.settings = settings
+        self.breaker = breaker
+
+    def __getattr__(self, name):
+        attribute = getattr(self.client, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            return self._call(name, attribute, args, kwargs)
+        return call
+
+    def _should_retry(self, error, name, attempt):
+        # Once the breaker has opened there is no point in retrying; surface
+        # the real error rather than the CircuitOpenError the retry would hit.
+        return (isinstance(error, ConnectionTimeout) and name in RETRYABLE_OPERATIONS
+                and attempt < self.settings.max_retries and not self.breaker.is_open)
+
+    def _call(self, name, method, args, kwargs):
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                result = method(*args, **kwargs)
+            except Exception as e:
+                if not _is_unavailable(e):
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                if not self._should_retry(e, name, attempt):
+                    raise
+                ES_RETRIES.labels(name).inc()
+                time.sleep(self.settings.backoff(attempt))
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+
+class AsyncResilientElasticsearch(ResilientElasticsearch):
+    """``ResilientElasticsearch`` for ``AsyncElasticsearch``; API methods are coroutines."""
+
+    async def _call(self, name, method, args, kwargs):
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                result = await method(*args, **kwargs)
+            except Exception as e:
+                if not _is_unavailable(e):
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                if not self._should_retry(e, name, attempt):
+                    raise
+                ES_RETRIES.labels(name).inc()
+                await asyncio.sleep(self.settings.backoff(attempt))
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+
+def create_client(hosts, settings, breaker):
+    """Pooled sync client; no request is made until it is first used.
+
+    The transport's own retries are disabled so ``ResilientElasticsearch``
+    alone decides what is retried.
+    """
+    client = Elasticsearch(hosts, timeout=settings.request_timeout, maxsize=settings.pool_size, max_retries=0)
+    return ResilientElasticsearch(client, settings, breaker)
+
+
+def create_async_client(hosts, settings, breaker):
+    client = AsyncElasticsearch(hosts, timeout=settings.async_request_timeout, maxsize=settings.pool_size, max_retries=0)
+    return AsyncResilientElasticsearch(client, settings, breaker)
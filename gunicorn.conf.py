@@ -0,0 +1,63 @@
+# Gunicorn settings for serving the alerts API; every value can be
+# overridden from the environment.
+import multiprocessing
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# One process per core; gthread workers serve concurrent dashboard users
+# from a thread pool while streamed responses wait on ES. Keep threads in
+# line with ES_POOL_SIZE (default 32 = 16 slice workers + 16 threads).
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+
+# Import the app once in the master and fork it; background threads are
+# started per worker in post_fork. Only one worker at a time runs the local
+# store sync (AlertStoreSync holds a lock file next to the store).
+preload_app = True
+
+# Workers write their Prometheus samples to files here and /metrics adds them
+# up. prometheus_client reads this at import, so it is set before preloading.
+prometheus_multiproc_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', tempfile.mkdtemp(prefix='alerts-api-metrics-'))
+os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+
+# A worker that stops heartbeating for this long is killed and replaced.
+# Large CSV and export streams keep running as long as the worker is alive;
+# each ES call is bounded by ES_REQUEST_TIMEOUT instead.
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+# On SIGTERM, in-flight requests get this long to finish before shutdown
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers now and then so a slow leak cannot grow unbounded
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 500))
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    # Samples left by a previous run would be added to this run's totals
+    for name in os.listdir(prometheus_multiproc_dir):
+        if name.endswith('.db'):
+            os.remove(os.path.join(prometheus_multiproc_dir, name))
+
+
+def post_fork(server, worker):
+    import wsgi
+    wsgi.start_background_tasks()
+
+
+def worker_exit(server, worker):
+    import wsgi
+    wsgi.shutdown()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,256 @@
+import logging
+import queue
+import threading
+import time
+
+from e2 import alert_attributes, epoch_millis, INDEX_LAG_MS
+from serialization import dumps_envelope
+
+
+# Seconds between incremental queries for each watched responder
+FEED_POLL_INTERVAL = 5
+# Events buffered per subscriber; a client that falls further behind is
+# disconnected and catches up through Last-Event-ID when it reconnects.
+SUBSCRIBER_QUEUE_SIZE = 100
+# Reconnects older than this get only new changes instead of a replay
+MAX_REPLAY_MS = 60 * 60 * 1000
+# Open streams per process; each one holds a server thread while it lasts
+MAX_SUBSCRIBERS = 8
+
+FEED_CLOSED = object()
+
+
+class FeedFullError(Exception):
+    """Raised by ``AlertFeedHub.subscribe`` when the process already serves its maximum number of streams."""
+
+
+def _updated_at(hit):
+    return epoch_millis(alert_attributes(hit.get('_source')).get('updatedAt'))
+
+
+def format_event(responder_name, alerts, event_id):
+    """Encode a delta as one SSE ``alerts`` event whose id is the watermark after it."""
+    data = dumps_envelope({"responder_name": responder_name, "count": len(alerts)}, alerts)
+    return b"id: %d\nevent: alerts\ndata: %s\n\n" % (event_id, data)
+
+
+class Subscription:
+    def __init__(self, responder_name, filters=None):
+        self.responder_name = responder_name
+        self.filters = filters
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def get(self, timeout):
+        """Next encoded event, ``FEED_CLOSED`` when the stream should end, or None on timeout."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except queue.Full:
+            return False
+
+    def close(self):
+        # Make room so the close marker always gets through
+        while True:
+            try:
+                self.queue.put_nowait(FEED_CLOSED)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+class ResponderFeed:
+    """Background poller publishing one responder's alert changes to its subscribers.
+
+    Every ``interval`` seconds it fetches the alerts with ``updatedAt`` at or
+    after ``watermark - e2.INDEX_LAG_MS``, skips versions already published,
+    maps the rest once with ``transformer.transform_records`` and hands the
+    same encoded event to every subscriber. The thread exits once the last
+    subscriber has left.
+    """
+
+    def __init__(self, backend, transformer, responder_name, interval=FEED_POLL_INTERVAL, on_idle=None, filters=None):
+        self.backend = backend
+        self.transformer = transformer
+        self.responder_name = responder_name
+        self.filters = filters
+        self.interval = interval
+        self.on_idle = on_idle
+        self.watermark = int(time.time() * 1000)
+        self._published = {}
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"alert-feed-{responder_name}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, set()
+        for subscriber in subscribers:
+            subscriber.close()
+
+    def add(self, subscriber):
+        with self._lock:
+            self._subscribers.add(subscriber)
+
+    def remove(self, subscriber):
+        """Drop ``subscriber``; returns True if the feed has none left."""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            return not self._subscribers
+
+    def replay_since(self, last_event_id):
+        """Encoded event with the changes in ``[last_event_id, watermark)``, for a reconnecting client, or None.
+
+        When the reconnecting client is the feed's only subscriber, replayed
+        versions count as published so the next poll's look-back does not
+        send them again. With others attached they stay unpublished: a
+        change indexed late still has to reach them through the poll.
+        """
+        watermark = self.watermark
+        if last_event_id >= watermark or watermark - last_event_id > MAX_REPLAY_MS:
+            return None
+        hits = [hit for hit in self._fetch(last_event_id) if (_updated_at(hit) or 0) < watermark]
+        if not hits:
+            return None
+        with self._lock:
+            if len(self._subscribers) <= 1:
+                for hit in hits:
+                    updated_at = _updated_at(hit)
+                    if updated_at is not None and self._published.get(hit['_id'], -1) < updated_at:
+                        self._published[hit['_id']] = updated_at
+        return format_event(self.responder_name, self._transform(hits), watermark)
+
+    def poll_once(self):
+        since = self.watermark - INDEX_LAG_MS
+        hits = self._fetch(since)
+        fresh = []
+        newest = self.watermark
+        with self._lock:
+            for hit in hits:
+                updated_at = _updated_at(hit)
+                if updated_at is None or self._published.get(hit['_id'], -1) >= updated_at:
+                    continue
+                self._published[hit['_id']] = updated_at
+                fresh.append(hit)
+                newest = max(newest, updated_at + 1)
+            # Versions older than the next look-back can no longer be refetched
+            self._published = {key: updated_at for key, updated_at in self._published.items() if updated_at >= newest - INDEX_LAG_MS}
+        self.watermark = newest
+        if not fresh:
+            return 0
+
+        event = format_event(self.responder_name, self._transform(fresh), newest)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            if not subscriber.put(event):
+                logging.warning(f"Disconnecting slow alert feed subscriber for {self.responder_name}")
+                self.remove(subscriber)
+                subscriber.close()
+        return len(fresh)
+
+    def _fetch(self, since):
+        hits = []
+        hit_pages = self.backend.iter_updated_alert_hit_pages(since, self.responder_name, self.filters)
+        try:
+            for page in hit_pages:
+                hits.extend(page)
+        finally:
+            hit_pages.close()
+        return hits
+
+    def _transform(self, hits):
+        return self.transformer.transform_records([hit['_source'] for hit in hits])
+
+    def is_idle(self):
+        with self._lock:
+            return not self._subscribers
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            # on_idle decides under the hub's lock, so no subscriber can join a feed that is exiting
+            if self.on_idle(self) if self.on_idle is not None else self.is_idle():
+                return
+            try:
+                self.poll_once()
+            except Exception as e:
+                logging.error(f"Error polling alert feed for {self.responder_name}: {e}")
+
+
+class AlertFeedHub:
+    """One ``ResponderFeed`` per responder and filter set with subscribers, shared by all their streams.
+
+    Feeds are per process: under gunicorn each worker polls the responders
+    its own streams watch. At most ``max_subscribers`` streams are open at
+    once, so they cannot take every thread of the worker.
+    """
+
+    def __init__(self, backend, transformer, interval=FEED_POLL_INTERVAL, max_subscribers=MAX_SUBSCRIBERS):
+        self.backend = backend
+        self.transformer = transformer
+        self.interval = interval
+        self.max_subscribers = max_subscribers
+        self._feeds = {}
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, responder_name, last_event_id=None, filters=None):
+        """Register a new subscriber; with ``last_event_id`` it first receives what it missed.
+
+        Raises ``FeedFullError`` when ``max_subscribers`` streams are already open.
+        """
+        subscriber = Subscription(responder_name, filters)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise FeedFullError(f"{len(self._subscribers)} alert streams are already open")
+            self._subscribers.add(subscriber)
+            feed = self._feeds.get((responder_name, filters))
+            if feed is None:
+                feed = self._feeds[(responder_name, filters)] = ResponderFeed(
+                    self.backend, self.transformer, responder_name, self.interval, on_idle=self._discard_if_idle, filters=filters)
+                feed.start()
+            feed.add(subscriber)
+        if last_event_id is not None:
+            try:
+                replay = feed.replay_since(last_event_id)
+                if replay is not None:
+                    subscriber.put(replay)
+            except Exception as e:
+                logging.error(f"Error replaying alert feed for {responder_name}: {e}")
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            feed = self._feeds.get((subscriber.responder_name, subscriber.filters))
+        if feed is not None:
+            feed.remove(subscriber)
+
+    def close(self):
+        """Stop every poller and end all open streams."""
+        with self._lock:
+            feeds, self._feeds = list(self._feeds.values()), {}
+            self._subscribers = set()
+        for feed in feeds:
+            feed.stop()
+
+    def _discard_if_idle(self, feed):
+        with self._lock:
+            if not feed.is_idle():
+                return False
+            if self._feeds.get((feed.responder_name, feed.filters)) is feed:
+                del self._feeds[(feed.responder_name, feed.filters)]
+            return True
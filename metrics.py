@@ -0,0 +1,127 @@
+from contextlib import contextmanager
+import contextvars
+import os
+import threading
+import time
+
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client import multiprocess
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+REQUEST_LATENCY = Histogram(
+    'alerts_api_request_duration_seconds', 'Request latency by route, including streamed bodies',
+    ['route', 'method', 'status'], buckets=LATENCY_BUCKETS)
+STAGE_LATENCY = Histogram(
+    'alerts_api_stage_duration_seconds', 'Time spent in each request stage',
+    ['route', 'stage'], buckets=LATENCY_BUCKETS)
+ES_REQUESTS = Counter('alerts_api_es_requests_total', 'Elasticsearch calls', ['operation'])
+ES_ERRORS = Counter('alerts_api_es_errors_total', 'Failed Elasticsearch calls', ['operation', 'error'])
+ES_RETRIES = Counter('alerts_api_es_retries_total', 'Elasticsearch calls retried after a timeout', ['operation'])
+ES_CIRCUIT_OPEN = Gauge('alerts_api_es_circuit_open', '1 while the Elasticsearch circuit breaker is open in any worker',
+                        multiprocess_mode='livemax')
+COALESCED_REQUESTS = Counter('alerts_api_coalesced_requests_total', 'Requests that shared an identical in-flight fetch', ['operation'])
+ES_PAGES = Counter('alerts_api_es_pages_total', 'Search and scroll pages fetched', ['route'])
+DOCS_FETCHED = Counter('alerts_api_docs_fetched_total', 'Alert documents fetched from Elasticsearch', ['route'])
+RESPONSE_BYTES = Counter('alerts_api_response_bytes_total', 'Response body bytes sent', ['route'])
+
+_current_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Per-request breakdown of where the time went.
+
+    Stage durations accumulate across calls, so for sliced scrolls
+    ``es_query`` is the sum over all slices and can exceed wall time.
+    Counters cover ES pages, documents fetched and response bytes.
+    """
+
+    def __init__(self, route):
+        self.route = route
+        self.started_at = time.perf_counter()
+        self.stages = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started_at
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def as_dict(self):
+        with self._lock:
+            timings = {f"{name}_ms": round(seconds * 1000, 3) for name, seconds in self.stages.items()}
+            timings.update(self.counts)
+        timings["total_ms"] = round(self.elapsed() * 1000, 3)
+        return timings
+
+    def server_timing(self):
+        with self._lock:
+            return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.stages.items())
+
+    def observe(self):
+        """Export the breakdown to the Prometheus stage histograms and counters."""
+        with self._lock:
+            for name, seconds in self.stages.items():
+                STAGE_LATENCY.labels(self.route, name).observe(seconds)
+            ES_PAGES.labels(self.route).inc(self.counts.get('es_pages', 0))
+            DOCS_FETCHED.labels(self.route).inc(self.counts.get('docs', 0))
+            RESPONSE_BYTES.labels(self.route).inc(self.counts.get('bytes', 0))
+
+
+def start_request_timings(route):
+    timings = RequestTimings(route)
+    _current_timings.set(timings)
+    return timings
+
+
+def current_timings():
+    return _current_timings.get()
+
+
+@contextmanager
+def es_call(operation):
+    """Time one ES call into the current request's ``es_query`` stage and count failures."""
+    timings = _current_timings.get()
+    start = time.perf_counter()
+    ES_REQUESTS.labels(operation).inc()
+    try:
+        yield
+    except Exception as e:
+        ES_ERRORS.labels(operation, type(e).__name__).inc()
+        raise
+    finally:
+        if timings is not None:
+            timings.add('es_query', time.perf_counter() - start)
+
+
+def record_page(hit_count):
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.incr('es_pages')
+        timings.incr('docs', hit_count)
+
+
+def render_metrics():
+    # Under gunicorn each worker writes its samples to PROMETHEUS_MULTIPROC_DIR
+    # (see gunicorn.conf.py); a scrape must add up every worker's files.
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,132 @@
+import gzip
+import json
+import zlib
+
+from flask.json.provider import DefaultJSONProvider
+
+from transform import AlertRecord
+
+# orjson and brotli are optional; without them responses fall back to the
+# stdlib encoder and gzip.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+# Dynamic responses: brotli's default quality (11) is far too slow per request
+BROTLI_QUALITY = 5
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html'}
+
+
+def _default(obj):
+    if isinstance(obj, AlertRecord):
+        # Records nested anywhere else; orjson 3.9+ embeds their own JSON as is
+        if orjson is not None and hasattr(orjson, 'Fragment'):
+            return orjson.Fragment(obj.to_json())
+        return obj.as_dict()
+    return DefaultJSONProvider.default(obj)
+
+
+def dumps(obj):
+    """Serialize ``obj`` (which may contain ``AlertRecord``s) to compact JSON bytes."""
+    if isinstance(obj, AlertRecord):
+        return obj.to_json().encode()
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode()
+
+
+def dump_records(records):
+    """Serialize ``AlertRecord``s as a compact JSON array without building a dict per record."""
+    return ('[' + ','.join([record.to_json() for record in records]) + ']').encode()
+
+
+def dumps_envelope(envelope, data):
+    """Serialize ``envelope`` with ``data`` added as its last key, ``"data"``.
+
+    A list of records is written by ``dump_records`` and spliced into the
+    encoded envelope; other data goes through ``dumps``.
+    """
+    head = dumps(envelope)
+    body = dump_records(data) if data and isinstance(data[0], AlertRecord) else dumps(data)
+    return head[:-1] + (b',"data":' if len(head) > 2 else b'"data":') + body + b'}'
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson when it is installed."""
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj).decode()
+
+    def response(self, *args, **kwargs):
+        return self._app.response_class(dumps(self._prepare_response_obj(args, kwargs)), mimetype=self.mimetype)
+
+
+def negotiate_encoding(accept_encodings):
+    """Pick 'br' or 'gzip' from the request's ``Accept-Encoding``, or None for identity."""
+    best, best_quality = None, 0
+    for encoding in (['br'] if brotli is not None else []) + ['gzip']:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress_response(response, accept_encodings):
+    """Compress a Flask response in place when the client accepts it.
+
+    Buffered bodies are compressed in one go. Streamed bodies are compressed
+    chunk by chunk and flushed after every chunk so the client still
+    receives each page as soon as it is produced.
+    """
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    encoding = negotiate_encoding(accept_encodings)
+    response.vary.add('Accept-Encoding')
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < MIN_COMPRESS_SIZE:
+            return response
+        if encoding == 'br':
+            response.set_data(brotli.compress(body, quality=BROTLI_QUALITY))
+        else:
+            response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def _compress_stream(chunks, encoding):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        compress, flush, finish = compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = compress(chunk) + flush()
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
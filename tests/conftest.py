@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_es import FakeElasticsearchServer
+from benchmarks.synthetic import SyntheticAlerts
+
+
+@pytest.fixture(scope='session')
+def fake_es():
+    """A local fake ES serving 20k synthetic alerts over January 2024 (about 83 per responder per day)."""
+    with FakeElasticsearchServer(SyntheticAlerts(20000)) as server:
+        yield server
+
+
+@pytest.fixture(scope='session')
+def app_module(fake_es):
+    """The Flask app module with both backends pointed at ``fake_es``."""
+    os.environ['ES_HOSTS'] = fake_es.url
+    import app
+    yield app
+    app.shutdown()
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
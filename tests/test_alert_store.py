@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import e2
+from alert_store import SQLiteAlertStore, AlertStoreSync, SQLiteAlertBackend
+
+
+@pytest.fixture
+def backend():
+    backend = e2.ElasticsearchBackend(max_workers=1)
+    backend.iter_updated_alert_hit_pages = lambda updated_since, *args: (page for page in ())
+    yield backend
+    backend.close()
+
+
+def test_coverage_bound_is_ist_wall_clock(tmp_path, backend):
+    store = SQLiteAlertStore(str(tmp_path / 'alerts.db'))
+    AlertStoreSync(backend, store, initial_lookback_days=1).sync_once()
+
+    watermark = store.get_state('updated_at_watermark')
+    expected = datetime(1970, 1, 1) + timedelta(milliseconds=watermark, hours=5, minutes=30)
+    assert store.get_state('covered_from') == expected.strftime('%Y/%m/%d %H:%M:%S')
+
+    source = SQLiteAlertBackend(store, fallback=backend)
+    just_before = expected - timedelta(hours=1)
+    assert not source._covered(just_before.strftime('%Y/%m/%d %H:%M:%S'))
+    assert source._covered(expected.strftime('%Y/%m/%d %H:%M:%S'))
+
+
+def test_legacy_utc_bound_is_converted(tmp_path, backend):
+    store = SQLiteAlertStore(str(tmp_path / 'alerts.db'))
+    store.set_state('updated_at_watermark', 1704067200000)
+    store.set_state('synced_from', '2024/01/01 00:00:00')
+
+    AlertStoreSync(backend, store).sync_once()
+
+    assert store.get_state('covered_from') == '2024/01/01 05:30:00'
+
+
+def test_only_one_sync_holds_the_store(tmp_path, backend):
+    store = SQLiteAlertStore(str(tmp_path / 'alerts.db'))
+    first = AlertStoreSync(backend, store)
+    second = AlertStoreSync(backend, store)
+
+    assert first.acquire_lock()
+    assert not second.acquire_lock()
+
+    first.release_lock()
+    assert second.acquire_lock()
+    second.release_lock()
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+import time
+
+from cache import BucketedAlertCache
+
+EPOCH = datetime(1970, 1, 1)
+NOW = datetime(2024, 1, 10, 12, 0, 0)
+
+
+def alert(alert_id, created, status='open', updated_at=None):
+    return {'parsedMessage': {'attributes': {
+        'alertId': alert_id, 'status': status,
+        'createdAt': int((created - EPOCH) / timedelta(milliseconds=1)),
+        'updatedAt': updated_at if updated_at is not None else int(time.time() * 1000)}}}
+
+
+class StubBackend:
+    """Serves ``alerts`` the way the ES backend's hit pages do and records each query."""
+
+    def __init__(self, alerts):
+        self.alerts = alerts
+        self.queries = []
+
+    def iter_alert_hit_pages(self, responder_name, start_date, end_date, start_time, end_time, updated_since=None, filters=None):
+        self.queries.append(('hits', start_date, start_time, end_time, updated_since))
+        start = datetime.strptime(f"{start_date} {start_time}", '%Y-%m-%d %H:%M:%S')
+        end = datetime.strptime(f"{end_date} {end_time}", '%Y-%m-%d %H:%M:%S')
+        hits = []
+        for doc in self.alerts:
+            attributes = doc['parsedMessage']['attributes']
+            created = EPOCH + timedelta(milliseconds=attributes['createdAt'])
+            if start <= created < end and (updated_since is None or attributes['updatedAt'] >= updated_since):
+                hits.append({'_source': doc, 'sort': [attributes['createdAt']]})
+        yield hits
+
+    def iter_alert_pages(self, responder_name, start_date, end_date, start_time, end_time, all_fields=False, filters=None):
+        self.queries.append(('pages', start_date, start_time, end_time, filters))
+        yield []
+
+
+def window(day, start_time, end_time):
+    return dict(start_date=day, end_date=day, start_time=start_time, end_time=end_time)
+
+
+def ids(cache, **query):
+    return [doc['parsedMessage']['attributes']['alertId'] for doc in cache.iter_alerts('team', **query)]
+
+
+def test_unsettled_buckets_are_refreshed_and_merged():
+    backend = StubBackend([alert('a', NOW - timedelta(hours=2, minutes=30)), alert('b', NOW - timedelta(hours=1, minutes=30))])
+    cache = BucketedAlertCache(backend, refresh_interval=0, now=lambda: NOW)
+    query = window('2024-01-10', '09:00:00', '11:00:00')
+
+    assert ids(cache, **query) == ['a', 'b']
+    assert [q[0] for q in backend.queries] == ['hits']
+
+    backend.alerts[0] = alert('a', NOW - timedelta(hours=2, minutes=30), status='closed')
+    backend.alerts.append(alert('c', NOW - timedelta(hours=1, minutes=10)))
+    backend.queries.clear()
+
+    assert ids(cache, **query) == ['a', 'b', 'c']
+    assert len(backend.queries) == 1 and backend.queries[0][4] is not None
+    statuses = [doc['parsedMessage']['attributes']['status'] for doc in cache.iter_alerts('team', **query)]
+    assert statuses == ['closed', 'open', 'open']
+
+
+def test_settled_buckets_are_sealed():
+    day_before = NOW - timedelta(days=2)
+    backend = StubBackend([alert('closed', day_before.replace(hour=9, minute=15), status='closed'),
+                           alert('open', day_before.replace(hour=10, minute=15))])
+    cache = BucketedAlertCache(backend, refresh_interval=0, now=lambda: NOW)
+    query = window('2024-01-08', '09:00:00', '11:00:00')
+
+    assert ids(cache, **query) == ['closed', 'open']
+    backend.queries.clear()
+
+    assert ids(cache, **query) == ['closed', 'open']
+    # Only the bucket still holding an open alert is refreshed
+    assert [(q[2], q[3]) for q in backend.queries] == [('10:00:00', '11:00:00')]
+
+
+def test_filtered_windows_bypass_the_cache():
+    backend = StubBackend([alert('a', NOW - timedelta(hours=2, minutes=30))])
+    cache = BucketedAlertCache(backend, refresh_interval=0, now=lambda: NOW)
+    filters = (('status', ('open',)),)
+
+    list(cache.iter_alerts('team', **window('2024-01-10', '09:00:00', '11:00:00'), filters=filters))
+
+    assert backend.queries == [('pages', '2024-01-10', '09:00:00', '11:00:00', filters)]
+    assert not cache._buckets
@@ -0,0 +1,46 @@
+import csv
+from io import BytesIO, StringIO
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from columnar import ALERT_EXPORTER
+
+# Long enough for several 1000-alert scroll pages for one responder
+WINDOW = {'responder_name': 'olympus_middleware_sre', 'start_date': '2024-01-02', 'end_date': '2024-01-30',
+          'start_time': '00:00:00', 'end_time': '00:00:00'}
+
+
+def read_export(export_format, body):
+    if export_format == 'parquet':
+        return pq.read_table(BytesIO(body))
+    return pa.ipc.open_stream(body).read_all()
+
+
+@pytest.mark.parametrize('export_format', ['parquet', 'arrow'])
+def test_export_reads_back_like_the_csv(client, export_format):
+    rows = list(csv.DictReader(StringIO(client.get('/alerts_csv', query_string=WINDOW).get_data(as_text=True))))
+
+    response = client.get('/alerts_export', query_string=dict(WINDOW, format=export_format))
+    assert response.status_code == 200
+    table = read_export(export_format, response.get_data())
+
+    assert table.schema == ALERT_EXPORTER.schema
+    assert table.num_rows == len(rows)
+    assert table.column('AlertID').to_pylist() == [row['AlertID'] for row in rows]
+
+
+@pytest.mark.parametrize('export_format', ['parquet', 'arrow'])
+def test_export_error_aborts_the_stream(app_module, client, monkeypatch, export_format):
+    first_page = next(app_module.es_backend.iter_alert_pages(WINDOW['responder_name'], '2024-01-02', '2024-01-03'))
+
+    class FailingSource:
+        def iter_alert_pages(self, *args, **kwargs):
+            yield first_page
+            raise ConnectionError("scroll failed")
+
+    monkeypatch.setattr(app_module, 'stream_source', FailingSource())
+    # Ending normally would leave an Arrow stream that reads as a shorter table
+    with pytest.raises(ConnectionError):
+        client.get('/alerts_export', query_string=dict(WINDOW, format=export_format)).get_data()
@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from live_feed import ResponderFeed, AlertFeedHub, FeedFullError, Subscription
+
+
+class StubSource:
+    """Hands out fixed hits for ``iter_updated_alert_hit_pages`` and maps a doc to its id."""
+
+    def __init__(self, hits):
+        self.hits = hits
+
+    def iter_updated_alert_hit_pages(self, updated_since, responder_name=None, filters=None):
+        yield [hit for hit in self.hits if hit['_source']['parsedMessage']['attributes']['updatedAt'] >= updated_since]
+
+    def transform_records(self, docs):
+        return [doc['id'] for doc in docs]
+
+
+def hit(alert_id, updated_at):
+    return {'_id': alert_id, '_source': {'id': alert_id, 'parsedMessage': {'attributes': {'updatedAt': updated_at}}}}
+
+
+def events(subscription):
+    sent = []
+    while True:
+        event = subscription.get(timeout=0)
+        if event is None:
+            return sent
+        sent.append(event)
+
+
+def test_replayed_changes_are_not_sent_again():
+    now = int(time.time() * 1000)
+    source = StubSource([hit('a', now - 60000), hit('b', now - 30000)])
+    feed = ResponderFeed(source, source, 'team')
+    returning = Subscription('team')
+    feed.add(returning)
+
+    replay = feed.replay_since(now - 120000)
+    assert b'"count":2' in replay
+    assert feed.poll_once() == 0
+
+    source.hits.append(hit('b', now + 1))
+    assert feed.poll_once() == 1
+    assert len(events(returning)) == 1
+
+
+def test_replay_does_not_hide_late_changes_from_attached_subscribers():
+    source = StubSource([])
+    feed = ResponderFeed(source, source, 'team')
+    attached = Subscription('team')
+    feed.add(attached)
+    returning = Subscription('team')
+    feed.add(returning)
+    # Indexed late: updated before the watermark, but no poll has seen it yet
+    source.hits.append(hit('late', feed.watermark - 1000))
+
+    assert b'"count":1' in feed.replay_since(feed.watermark - 60000)
+    assert feed.poll_once() == 1
+    assert len(events(attached)) == 1
+
+
+def test_streams_over_the_cap_are_refused():
+    source = StubSource([])
+    hub = AlertFeedHub(source, source, interval=60, max_subscribers=2)
+    try:
+        first = hub.subscribe('team')
+        hub.subscribe('other')
+        with pytest.raises(FeedFullError):
+            hub.subscribe('team')
+
+        hub.unsubscribe(first)
+        hub.subscribe('team')
+    finally:
+        hub.close()
+
+
+def test_stream_over_the_cap_gets_503(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module.alert_feed, 'max_subscribers', 0)
+    response = client.get('/alerts/stream', query_string={'responder_name': 'team'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
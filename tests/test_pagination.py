@@ -0,0 +1,58 @@
+import base64
+import json
+
+import pytest
+
+WINDOW = {'responder_name': 'olympus_middleware_sre', 'start_date': '2024-01-02', 'end_date': '2024-01-04',
+          'start_time': '00:00:00', 'end_time': '00:00:00'}
+
+
+def cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('limit', ['abc', '0', '-5', '1.5', '100000'])
+def test_invalid_limit_is_rejected(client, limit):
+    response = client.get('/alerts', query_string=dict(WINDOW, limit=limit))
+    assert response.status_code == 400
+    assert 'limit' in response.get_json()['error']
+
+
+@pytest.mark.parametrize('payload', [
+    {'sort': [['CreatedAt', 'sideways']], 'after': [1, 'a']},
+    {'sort': [['Nope', 'asc']], 'after': [1, 'a']},
+    {'sort': [[['CreatedAt'], 'asc']], 'after': [1, 'a']},
+    {'sort': [], 'after': ['a']},
+    {'sort': [['CreatedAt', 'desc']], 'after': [1]},
+    {'sort': [['CreatedAt', 'desc']], 'after': 'x'},
+])
+def test_tampered_cursor_is_rejected(client, payload):
+    response = client.get('/alerts', query_string=dict(WINDOW, cursor=cursor(payload)))
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'invalid cursor'
+
+
+
+def test_cursor_round_trip(app_module):
+    sort = [('Priority', 'asc'), ('CreatedAt', 'desc')]
+    encoded = app_module.encode_cursor(sort, ['P2', 1704153600000, 'alert-1'])
+    assert app_module.decode_cursor(encoded) == (sort, ['P2', 1704153600000, 'alert-1'])
+
+
+@pytest.mark.parametrize('limit', ['abc', '0'])
+def test_invalid_batch_limit_is_rejected(client, limit):
+    response = client.get('/alerts/batch', query_string=dict(WINDOW, responder_names='a,b', limit=limit))
+    assert response.status_code == 400
+
+
+def test_explicit_end_time_is_not_rounded(app_module, client, monkeypatch):
+    windows = []
+
+    def get_alert_records(responder_name, start_date, end_date, start_time, end_time, *args):
+        windows.append((end_date, end_time))
+        return [], None
+
+    monkeypatch.setattr(app_module.alert_source, 'get_alert_records', get_alert_records)
+    client.get('/alerts', query_string=dict(WINDOW, end_time='10:00:07'))
+
+    assert windows == [('2024-01-04', '10:00:07')]
@@ -0,0 +1,49 @@
+import pytest
+from elasticsearch import Elasticsearch, RequestError
+
+import e2
+from benchmarks.run import BenchBackend
+
+RESPONDER = 'olympus_middleware_sre'
+
+
+def fetch(backend, start_date, end_date):
+    return [doc for page in backend.iter_alert_pages(RESPONDER, start_date, end_date, '00:00:00', '00:00:00') for doc in page]
+
+
+def created_at(docs):
+    return [doc['parsedMessage']['attributes']['createdAt'] for doc in docs]
+
+
+def test_small_window_uses_one_plain_scroll(fake_es, monkeypatch):
+    monkeypatch.setattr(e2, 'SLICE_MIN_HITS', 500)
+    backend = BenchBackend(Elasticsearch([fake_es.url]), page_size=100, slices=4)
+    before = dict(fake_es.engine.stats)
+
+    docs = fetch(backend, '2024-01-02', '2024-01-03')
+
+    assert 0 < len(docs) < 500
+    assert fake_es.engine.stats['search'] - before.get('search', 0) == 1
+    assert not backend._open_scrolls
+
+
+def test_large_window_is_sliced_and_merged_in_order(fake_es, monkeypatch):
+    monkeypatch.setattr(e2, 'SLICE_MIN_HITS', 500)
+    sliced = BenchBackend(Elasticsearch([fake_es.url]), page_size=100, slices=4)
+    plain = BenchBackend(Elasticsearch([fake_es.url]), page_size=100, slices=1)
+    before = dict(fake_es.engine.stats)
+
+    docs = fetch(sliced, '2024-01-02', '2024-01-10')
+
+    # The size probe plus one search per slice
+    assert fake_es.engine.stats['search'] - before.get('search', 0) == 5
+    assert created_at(docs) == sorted(created_at(docs))
+    assert created_at(docs) == created_at(fetch(plain, '2024-01-02', '2024-01-10'))
+    assert not sliced._open_scrolls
+
+
+def test_scroll_rejects_limited_total_hits(fake_es):
+    # Matches ES 7, so a probe that limits the count fails here as it would live
+    es = Elasticsearch([fake_es.url])
+    with pytest.raises(RequestError):
+        es.search(index=e2.ALERT_INDEX, body={'query': {'match_all': {}}, 'track_total_hits': 100}, scroll='1m', size=10)
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+import e2
+import serialization
+from live_feed import format_event
+from transform import AlertRecord
+from benchmarks.synthetic import SyntheticAlerts
+
+
+@pytest.fixture
+def records(monkeypatch):
+    corpus = SyntheticAlerts(50)
+    records = e2.ALERT_TRANSFORMER.transform_records([corpus.doc(i) for i in range(50)])
+    expected = [record.as_dict() for record in records]
+    # Record serialization must never go through the dict form
+    monkeypatch.setattr(AlertRecord, 'as_dict', lambda self: pytest.fail("as_dict called"))
+    return records, expected
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_envelope_splices_record_json(records, monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(serialization, 'orjson', None)
+    records, expected = records
+
+    body = serialization.dumps_envelope({"count": len(records)}, records)
+
+    assert json.loads(body) == {"count": len(records), "data": expected}
+    assert [json.loads(serialization.dumps(record)) for record in records] == expected
+
+
+def test_envelope_with_raw_docs_and_no_data():
+    assert json.loads(serialization.dumps_envelope({}, [])) == {"data": []}
+    assert json.loads(serialization.dumps_envelope({"count": 1}, [{"a": 1}])) == {"count": 1, "data": [{"a": 1}]}
+
+
+def test_feed_event_data_is_record_json(records):
+    records, expected = records
+    data = format_event('team', records, 7).split(b"data: ", 1)[1]
+    assert json.loads(data) == {"responder_name": "team", "count": len(records), "data": expected}
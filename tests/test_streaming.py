@@ -0,0 +1,20 @@
+import pytest
+
+# Long enough for several 1000-alert scroll pages for one responder
+WINDOW = {'responder_name': 'olympus_middleware_sre', 'start_date': '2024-01-02', 'end_date': '2024-01-30',
+          'start_time': '00:00:00', 'end_time': '00:00:00'}
+
+
+@pytest.mark.parametrize('path, params', [('/alerts_csv', {}), ('/alerts', {'format': 'ndjson'})])
+def test_first_page_is_sent_before_the_window_is_fetched(client, fake_es, path, params):
+    before = fake_es.engine.stats['scroll']
+    response = client.get(path, query_string=dict(WINDOW, **params), buffered=False)
+    try:
+        chunks = iter(response.response)
+        assert next(chunks) and next(chunks)
+        # Still on the page the opening search returned
+        assert fake_es.engine.stats['scroll'] == before
+        assert sum(len(chunk) for chunk in chunks)
+    finally:
+        response.close()
+    assert fake_es.engine.stats['scroll'] > before
@@ -0,0 +1,75 @@
+import e2
+from benchmarks.fake_es import _SourceFilter
+
+
+def alert(**attributes):
+    return {'parsedMessage': {'attributes': dict({
+        'alertId': 'a-1', 'priority': 'P2', 'status': 'open', 'createdAt': 1704153600000,
+        'updatedAt': 1704153660000, 'tags': ['db', 'paging'],
+    }, **attributes)}, 'message': 'not projected'}
+
+
+def test_projection_keeps_array_positions():
+    # An SMS contact has no emailId; filtering down to leaf paths would drop
+    # it and shift the e-mail contact into position 0.
+    doc = alert(responders=[{'name': 'sre', 'onCalls': [
+        {'contacts': [{'method': 'sms', 'to': '+910000000000'}, {'method': 'email', 'emailId': 'p@x'}]},
+        {'contacts': [{'method': 'email', 'emailId': 's@x'}]},
+    ]}])
+    projected = _SourceFilter(e2.SOURCE_FIELDS).apply(doc)
+
+    assert 'message' not in projected
+    mapped = e2.ALERT_TRANSFORMER.transform(projected)
+    assert mapped == e2.ALERT_TRANSFORMER.transform(doc)
+    assert 'PrimaryResponderEmail' not in mapped
+    assert mapped['SecondaryResponderEmail'] == 's@x'
+
+
+# Values each attribute can take, including the awkward ones: numeric
+# strings, garbage, booleans and containers where a leaf is expected.
+TIMESTAMPS = [1704153600000, 1704153600123.7, '1704153600000', '2024/01/02 00:00:00', 'n/a', True, 0, {'$date': 1}, []]
+VALUES = ['P2', 'closed', '', 'ünïcode', 7, 2.5, True, False, None, {'nested': 'x'}, ['a', 'b']]
+TAGS = [['db', 'paging'], [], 'db', {'team': 'sre'}, [['k8s'], {'x': 'y'}]]
+
+
+def random_contacts(rng):
+    return [rng.choice([{'method': 'email', 'emailId': f"{rng.randrange(9)}@x"}, {'method': 'sms'}, {}])
+            for _ in range(rng.randrange(3))]
+
+
+def random_alert(rng):
+    attributes = {}
+    for key, _ in e2.DIRECT_MAPPINGS.items():
+        path = e2.source_path(key)[2:]
+        if len(path) != 1 or rng.random() < 0.2:
+            continue
+        readable = e2.DIRECT_MAPPINGS[key]
+        pool = TIMESTAMPS if readable in ('CreatedAt', 'UpdatedAt', 'AlertAckTime', 'AlertCloseTime', 'TimeToClose') else VALUES
+        attributes[path[0]] = rng.choice(pool)
+    if rng.random() < 0.8:
+        attributes['responders'] = [
+            {'name': rng.choice(['sre', 7, None]), 'onCalls': [{'contacts': random_contacts(rng)} for _ in range(rng.randrange(3))]}
+            for _ in range(rng.randrange(3))]
+    if rng.random() < 0.7:
+        attributes['tags'] = rng.choice(TAGS)
+    if rng.random() < 0.3:
+        attributes['tags_extra'] = rng.choice(TAGS)
+    keys = list(attributes)
+    rng.shuffle(keys)
+    return {'parsedMessage': {'attributes': {key: attributes[key] for key in keys}}, 'message': 'raw'}
+
+
+def test_transformer_matches_reference_mapping():
+    import json
+    import random
+
+    backend = e2.ElasticsearchBackend(max_workers=1)
+    rng = random.Random(20240102)
+    docs = [random_alert(rng) for _ in range(3000)] + [{}, {'parsedMessage': None}, {'parsedMessage': {'attributes': []}}]
+    for doc in docs:
+        expected = backend.map_field_names(backend.flatten_json(doc))
+        assert e2.ALERT_TRANSFORMER.transform(doc) == expected, doc
+        record = e2.ALERT_TRANSFORMER.transform_record(doc)
+        assert record.as_dict() == expected, doc
+        assert json.loads(record.to_json()) == json.loads(json.dumps(expected)), doc
+    backend.close()
@@ -0,0 +1,244 @@
+from datetime import datetime, timedelta
+from json.encoder import encode_basestring_ascii
+from operator import attrgetter
+import json
+import logging
+import sys
+
+
+TIMESTAMP_FIELDS = {'CreatedAt', 'UpdatedAt', 'AlertCloseTime', 'AlertAckTime'}
+DURATION_FIELDS = {'TimeToClose'}
+IST_OFFSET = timedelta(hours=5, minutes=30)
+DATETIME_FORMAT = '%Y/%m/%d %H:%M:%S'
+ALERT_URL_TEMPLATE = "https://zeta.app.opsgenie.com/alert/detail/{}/details"
+TAGS_PREFIX = 'tags_'
+# Low-cardinality columns whose values are interned, so every record holding
+# e.g. 'P3' or 'closed' shares one string object.
+INTERNED_FIELDS = {'Cluster', 'Service', 'Priority', 'AlertType', 'Status', 'Severity', 'Team', 'Zone', 'BU'}
+# Columns map_field_names adds after the mapped fields
+DERIVED_FIELDS = ['TimeToAck', 'Tags', 'Acknowledge', 'AlertURL']
+
+_MISSING = object()
+
+
+def _lookup(node, path):
+    # Mirrors flatten_json: only leaves (anything that is not exactly a dict
+    # or a list) produce a value.
+    for part in path:
+        if type(part) is int:
+            if type(node) is not list or part >= len(node):
+                return _MISSING
+        elif type(node) is not dict or part not in node:
+            return _MISSING
+        node = node[part]
+    if type(node) is dict or type(node) is list:
+        return _MISSING
+    return node
+
+
+def _leaves(node):
+    if type(node) is dict:
+        for value in node.values():
+            yield from _leaves(value)
+    elif type(node) is list:
+        for value in node:
+            yield from _leaves(value)
+    else:
+        yield node
+
+
+def _to_millis(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _format_datetime(dt):
+    return f"{dt.year:04d}/{dt.month:02d}/{dt.day:02d} {dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}"
+
+
+class AlertTransformer:
+    """Precompiled equivalent of ``map_field_names(flatten_json(alert))``.
+
+    Built once from the mapping table as ``(path, readable_key)`` pairs with
+    paths relative to ``parsedMessage.attributes``. Each alert is transformed
+    by reading those paths directly instead of flattening the whole document,
+    and every timestamp/duration is converted exactly once. The same values
+    are available as dicts (``transform``) or as compact ``AlertRecord``s
+    (``transform_record``) whose columns match ``self.columns``.
+    """
+
+    def __init__(self, direct_fields, responder_fields):
+        self.fields = []
+        self.columns = []
+        for path, readable_key in list(direct_fields) + list(responder_fields):
+            if readable_key in TIMESTAMP_FIELDS:
+                kind = 'timestamp'
+            elif readable_key in DURATION_FIELDS:
+                kind = 'duration'
+            else:
+                kind = None
+            # Single-segment paths are plain dict lookups on the attributes
+            simple_key = path[0] if len(path) == 1 else None
+            self.fields.append((len(self.columns), readable_key, path, simple_key, kind, readable_key in INTERNED_FIELDS))
+            self.columns.append(readable_key)
+        self.columns += DERIVED_FIELDS
+        self.index = {column: i for i, column in enumerate(self.columns)}
+        self._positions = tuple(self.index[column] for column in (
+            'CreatedAt', 'AlertAckTime', 'Acknowledged', 'TimeToAck', 'Tags', 'Cluster', 'Zone', 'Acknowledge', 'AlertID', 'AlertURL'))
+        self.record_type = AlertRecord.with_columns(self.columns)
+
+    def transform(self, alert):
+        return {column: value for column, value in zip(self.columns, self._values(alert)) if value is not _MISSING}
+
+    def transform_page(self, alerts):
+        """Transform a whole scroll page of ``_source`` docs."""
+        transform = self.transform
+        return [transform(alert) for alert in alerts]
+
+    def transform_record(self, alert):
+        return self.record_type(self._values(alert))
+
+    def transform_records(self, alerts):
+        """Like ``transform_page`` but producing compact ``AlertRecord``s instead of dicts."""
+        record_type, values = self.record_type, self._values
+        return [record_type(values(alert)) for alert in alerts]
+
+    def _values(self, alert):
+        """Mapped values in ``self.columns`` order, ``_MISSING`` where the mapped dict has no key."""
+        parsed_message = alert.get('parsedMessage') if type(alert) is dict else None
+        attributes = parsed_message.get('attributes') if type(parsed_message) is dict else None
+        if type(attributes) is not dict:
+            attributes = {}
+
+        (created_at_i, ack_time_i, acknowledged_i, time_to_ack_i, tags_i,
+         cluster_i, zone_i, acknowledge_i, alert_id_i, alert_url_i) = self._positions
+        values = [_MISSING] * len(self.columns)
+        datetimes = {}
+        for position, readable_key, path, simple_key, kind, interned in self.fields:
+            if simple_key is not None:
+                value = attributes.get(simple_key, _MISSING)
+                if type(value) is dict or type(value) is list:
+                    continue
+            else:
+                value = _lookup(attributes, path)
+            if value is _MISSING:
+                continue
+
+            if kind == 'timestamp':
+                millis = _to_millis(value)
+                if millis is not None:
+                    dt = datetime.utcfromtimestamp(millis / 1000.0) + IST_OFFSET
+                    datetimes[readable_key] = dt
+                    value = _format_datetime(dt)
+            elif kind == 'duration':
+                millis = _to_millis(value)
+                if millis is not None:
+                    value = millis / (1000.0 * 60)
+            elif interned and type(value) is str:
+                value = sys.intern(value)
+            values[position] = value
+
+        created_at, ack_time, acknowledged = values[created_at_i], values[ack_time_i], values[acknowledged_i]
+        if created_at is not _MISSING and ack_time is not _MISSING and acknowledged is not _MISSING and acknowledged:
+            values[time_to_ack_i] = self._time_to_ack(created_at, ack_time, datetimes)
+
+        tags = []
+        for key, value in attributes.items():
+            if key == 'tags':
+                if type(value) is dict or type(value) is list:
+                    tags.extend(_leaves(value))
+            elif key.startswith(TAGS_PREFIX):
+                tags.extend(_leaves(value))
+        values[tags_i] = ', '.join(tags)
+
+        if values[cluster_i] is _MISSING:
+            values[cluster_i] = 'Notfound'
+        if values[zone_i] is _MISSING:
+            values[zone_i] = 'Notfound'
+        values[acknowledge_i] = 'false'
+
+        alert_id = values[alert_id_i]
+        if alert_id is not _MISSING and alert_id:
+            values[alert_url_i] = ALERT_URL_TEMPLATE.format(alert_id)
+
+        return values
+
+    def _time_to_ack(self, created_at, ack_time, datetimes):
+        try:
+            created, acked = datetimes.get('CreatedAt'), datetimes.get('AlertAckTime')
+            if created is None or acked is None:
+                created = datetime.strptime(created_at, DATETIME_FORMAT)
+                acked = datetime.strptime(ack_time, DATETIME_FORMAT)
+            # The formatted timestamps carry whole seconds only
+            delta = acked.replace(microsecond=0) - created.replace(microsecond=0)
+            return delta.total_seconds() / 60
+        except Exception as e:
+            logging.error(f"Error calculating TimeToAck: {e}")
+            return None
+
+
+def _json_value(value):
+    if type(value) is str:
+        return encode_basestring_ascii(value)
+    if value is None:
+        return 'null'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if type(value) is int or (type(value) is float and value - value == 0):
+        # What json.dumps writes for finite numbers, minus its call overhead
+        return repr(value)
+    return json.dumps(value)
+
+
+class AlertRecord:
+    """A mapped alert with a fixed schema and no per-record dict.
+
+    Concrete record types are made per column list with ``with_columns``;
+    each column is a slot, unset columns hold ``_MISSING``. Records write
+    themselves straight to JSON (keys sorted, as Flask does) or to a CSV
+    row, so the dict form is only built by ``as_dict`` when asked for.
+    """
+
+    __slots__ = ()
+    columns = ()
+    _json_prefixes = ()
+
+    @classmethod
+    def with_columns(cls, columns):
+        columns = tuple(columns)
+        json_columns = sorted(columns)
+        # A single tuple-unpacking assignment is much cheaper than one setattr per column
+        namespace = {}
+        exec(f"def __init__(self, values):\n    ({''.join(f'self.{column}, ' for column in columns)}) = values", namespace)
+        return type(cls.__name__, (cls,), {
+            '__slots__': columns,
+            '__init__': namespace['__init__'],
+            'columns': columns,
+            '_values': attrgetter(*columns),
+            '_json_values': attrgetter(*json_columns),
+            '_json_prefixes': tuple(encode_basestring_ascii(column) + ':' for column in json_columns),
+        })
+
+    def get(self, column, default=None):
+        value = getattr(self, column, _MISSING) if column in self.columns else _MISSING
+        return default if value is _MISSING else value
+
+    def as_dict(self):
+        return {column: value for column, value in zip(self.columns, self._values(self)) if value is not _MISSING}
+
+    def csv_row(self):
+        """Values in column order with '' for missing ones."""
+        return ['' if value is _MISSING else value for value in self._values(self)]
+
+    def to_json(self):
+        return '{' + ','.join([
+            prefix + (encode_basestring_ascii(value) if type(value) is str else _json_value(value))
+            for prefix, value in zip(self._json_prefixes, self._json_values(self)) if value is not _MISSING
+        ]) + '}'
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.as_dict()!r})"
@@ -0,0 +1,4 @@
+"""WSGI entry point: ``gunicorn --config gunicorn.conf.py wsgi:app``."""
+from app import app, start_background_tasks, shutdown
+
+__all__ = ['app', 'start_background_tasks', 'shutdown']